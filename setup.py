@@ -34,8 +34,13 @@ setup(
     python_requires=">=3.8",
     install_requires=[
         "requests>=2.31.0",
-        "geopy>=2.4.1",
+        "numpy>=1.20.0",
+        "matplotlib>=3.3.0",
     ],
+    extras_require={
+        "fast": ["lxml>=4.9.0", "pyproj>=3.0.0", "requests-cache>=1.0.0"],
+        "geodesic": ["geopy>=2.4.1"],
+    },
     entry_points={
         "console_scripts": [
             "gpx-route-timer=gpx_route_timer.main:main",
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 """GPX Route Timer - Add timestamps to GPX files for multi-day hikes"""
 
+from __future__ import annotations
+
 __version__ = "0.1.0"
 
 import sys
 import subprocess
 import os
+import importlib
+from importlib.util import find_spec
 
 
 def print_help():
@@ -25,11 +29,15 @@ Features:
   - Interactively set or adjust start/end times and overnight locations.
   - Validate route for realistic daily distances.
   - Download or load a GPX file from a URL or local path.
-  - Handles missing dependencies automatically.
+  - Optionally installs missing dependencies with pip.
 
 Options:
   [GPX_FILE_OR_URL]  The path or URL of the GPX file to process.
   -h, --help    Show this help message and exit.
+  --bootstrap   Install missing dependencies with pip before running.
+  --geodesic    Use WGS84 geodesic distances (pyproj or geopy) instead of
+                the faster spherical approximation.
+  --no-png      Skip the PNG route image (matplotlib is then not needed).
 
 For more information, see: https://github.com/pattespatte/gpx-route-timer
 """.format(
@@ -38,9 +46,13 @@ For more information, see: https://github.com/pattespatte/gpx-route-timer
     )
 
 
-if len(sys.argv) == 1 or sys.argv[1] in ("-h", "--help"):
-    print_help()
-    sys.exit(0)
+def pop_flag(args, flag):
+    """Remove a command line flag from the argument list and return whether it was given"""
+    if flag in args:
+        args.remove(flag)
+        return True
+    return False
+
 
 # Constants
 
@@ -62,10 +74,168 @@ OVERNIGHT_GAP_HOURS = 6
 # Maximum number of days ahead allowed for Komoot GPX uploads
 KOMOOT_MAX_DAYS_AHEAD = 14
 
+# Timeout (in seconds) for downloading GPX files from a URL
+DOWNLOAD_TIMEOUT_SECONDS = 30
+
+# Date and time format used in the itinerary, markdown and KML descriptions
+DISPLAY_TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# Accept "YYYY-MM-DD HH:MM" and "YYYY/MM/DD" spellings of entered times
+USER_TIME_TRANSLATION = str.maketrans({" ": "T", "/": "-"})
+
+# Buffer size (in bytes) used when writing XML output files
+XML_WRITE_BUFFER_SIZE = 1 << 20
+
+# Number of track points formatted at a time when writing KML coordinates
+KML_COORDINATE_BLOCK_SIZE = 10_000
+
+# Mean Earth radius in kilometers used by the haversine distance calculations
+EARTH_RADIUS_KM = 6371.0088
+
 GPX_NAMESPACE = "http://www.topografix.com/GPX/1/1"
 
+# Older GPX namespace that is also accepted as input
+GPX_10_NAMESPACE = "http://www.topografix.com/GPX/1/0"
+
+# Namespace-qualified GPX tag names, built once
+GPX_ROOT = f"{{{GPX_NAMESPACE}}}gpx"
+GPX_WPT = f"{{{GPX_NAMESPACE}}}wpt"
+GPX_RTE = f"{{{GPX_NAMESPACE}}}rte"
+GPX_RTEPT = f"{{{GPX_NAMESPACE}}}rtept"
+GPX_TRK = f"{{{GPX_NAMESPACE}}}trk"
+GPX_TRKSEG = f"{{{GPX_NAMESPACE}}}trkseg"
+GPX_TRKPT = f"{{{GPX_NAMESPACE}}}trkpt"
+GPX_METADATA = f"{{{GPX_NAMESPACE}}}metadata"
+GPX_NAME = f"{{{GPX_NAMESPACE}}}name"
+GPX_ELE = f"{{{GPX_NAMESPACE}}}ele"
+GPX_TIME = f"{{{GPX_NAMESPACE}}}time"
+
+# GPX 1.0 and un-namespaced tag names mapped to their GPX 1.1 equivalents
+GPX_COMPATIBLE_TAGS = {
+    prefix + name: f"{{{GPX_NAMESPACE}}}{name}"
+    for prefix in (f"{{{GPX_10_NAMESPACE}}}", "")
+    for name in (
+        "gpx",
+        "wpt",
+        "rte",
+        "rtept",
+        "trk",
+        "trkseg",
+        "trkpt",
+        "metadata",
+        "name",
+        "ele",
+        "time",
+    )
+}
+
 GITHUB_URL = "https://github.com/pattespatte/gpx-route-timer"
 
+# Komoot-compatible GPX route document around the route points, with
+# {name} and {created} filled in per file
+GPX_ROUTE_HEADER = (
+    "<?xml version='1.0' encoding='UTF-8'?>\n"
+    f'<gpx version="1.1" creator="{GITHUB_URL}" xmlns="{GPX_NAMESPACE}" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    f'xsi:schemaLocation="{GPX_NAMESPACE} {GPX_NAMESPACE}/gpx.xsd">\n'
+    "\t<metadata>\n"
+    "\t\t<name>{name}</name>\n"
+    "\t\t<author>\n"
+    f'\t\t\t<link href="{GITHUB_URL}">\n'
+    "\t\t\t\t<text>GPX Route Timer</text>\n"
+    "\t\t\t\t<type>text/html</type>\n"
+    "\t\t\t</link>\n"
+    "\t\t</author>\n"
+    "\t\t<time>{created}</time>\n"
+    "\t</metadata>\n"
+    "\t<rte>\n"
+    "\t\t<name>{name}</name>\n"
+)
+GPX_ROUTE_FOOTER = "\t</rte>\n</gpx>\n"
+
+# KML document pieces around the styles, tour, track and placemarks
+KML_DOCUMENT_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<kml xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2">\n'
+    "  <Document>\n"
+    "    <name>{name}</name>\n"
+    "    <description>Hiking route from {start} to {end}</description>"
+)
+# Line style for the track (red) and icon styles for the start (green),
+# overnight (red) and end (blue) placemarks; KML colors are aabbggrr
+KML_STYLES = (
+    '    <Style id="routeStyle">\n'
+    "      <LineStyle>\n"
+    "        <color>ff0000ff</color>\n"
+    "        <width>3</width>\n"
+    "      </LineStyle>\n"
+    "    </Style>\n"
+    '    <Style id="startStyle">\n'
+    "      <IconStyle>\n"
+    "        <color>ff00ff00</color>\n"
+    "        <scale>1.2</scale>\n"
+    "      </IconStyle>\n"
+    "    </Style>\n"
+    '    <Style id="sleepStyle">\n'
+    "      <IconStyle>\n"
+    "        <color>ff0000ff</color>\n"
+    "        <scale>1.1</scale>\n"
+    "      </IconStyle>\n"
+    "    </Style>\n"
+    '    <Style id="endStyle">\n'
+    "      <IconStyle>\n"
+    "        <color>ffff0000</color>\n"
+    "        <scale>1.2</scale>\n"
+    "      </IconStyle>\n"
+    "    </Style>"
+)
+KML_TOUR_HEADER = (
+    "    <gx:Tour>\n"
+    "      <name>Hike Flythrough</name>\n"
+    "      <description>Automated tour following hiking path</description>\n"
+    "      <gx:Playlist>"
+)
+KML_FLY_TO = (
+    "        <gx:FlyTo>\n"
+    "          <gx:duration>{duration:.1f}</gx:duration>\n"
+    "          <gx:flyToMode>smooth</gx:flyToMode>\n"
+    "          <LookAt>\n"
+    "            <longitude>{lon}</longitude>\n"
+    "            <latitude>{lat}</latitude>\n"
+    "            <altitude>0</altitude>\n"
+    "            <range>{range:.0f}</range>\n"
+    "            <tilt>{tilt}</tilt>\n"
+    "            <heading>{heading:.0f}</heading>\n"
+    "          </LookAt>\n"
+    "        </gx:FlyTo>"
+)
+KML_WAIT = (
+    "        <gx:Wait>\n"
+    "          <gx:duration>{duration}</gx:duration>\n"
+    "        </gx:Wait>"
+)
+KML_TOUR_FOOTER = "      </gx:Playlist>\n    </gx:Tour>"
+KML_TRACK_HEADER = (
+    "    <Placemark>\n"
+    "      <name>{name} - Track</name>\n"
+    "      <styleUrl>#routeStyle</styleUrl>\n"
+    "      <LineString>\n"
+    "        <tessellate>1</tessellate>\n"
+    "        <coordinates>"
+)
+KML_TRACK_FOOTER = "        </coordinates>\n      </LineString>\n    </Placemark>"
+KML_PLACEMARK = (
+    "    <Placemark>\n"
+    "      <name>{name}</name>\n"
+    "      <description>{description}</description>\n"
+    "      <styleUrl>#{style}</styleUrl>\n"
+    "      <Point>\n"
+    "        <coordinates>{lon},{lat},0</coordinates>\n"
+    "      </Point>\n"
+    "    </Placemark>"
+)
+KML_DOCUMENT_FOOTER = "  </Document>\n</kml>"
+
 
 def try_install_package(package):
     """Try to install a package using pip"""
@@ -80,26 +250,25 @@ def try_install_package(package):
         return False
 
 
-def check_and_install_dependencies():
+def check_and_install_dependencies(need_matplotlib=True):
     """Check for required packages and try to install if missing"""
     required = {
         "requests": "requests",
-        "geopy": "geopy",
         "numpy": "numpy",
         "matplotlib": "matplotlib",
     }
+    if not need_matplotlib:
+        del required["matplotlib"]
 
+    # Locate the packages without importing them
     missing = []
     for module, package in required.items():
-        try:
-            __import__(module)
-        except ImportError:
+        if find_spec(module) is None:
             print(f"Package '{package}' not found. Attempting to install...")
             if try_install_package(package):
                 print(f"✓ Successfully installed {package}")
-                try:
-                    __import__(module)
-                except ImportError:
+                importlib.invalidate_caches()
+                if find_spec(module) is None:
                     missing.append(package)
             else:
                 missing.append(package)
@@ -113,17 +282,78 @@ def check_and_install_dependencies():
         sys.exit(1)
 
 
-# Check dependencies before proceeding
-check_and_install_dependencies()
-
-# Now we can safely import everything
-import requests
+# requests and the optional pyproj and geopy are imported where they are used
+import hashlib
+import io
+import math
+import re
+import warnings
 import xml.etree.ElementTree as ET
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from geopy.distance import geodesic
-import numpy as np
+from functools import cached_property, lru_cache
 import os
-from urllib.parse import quote, urlparse
+from xml.sax.saxutils import escape
+
+# numpy is required, but a missing install is reported by main(), which can
+# also install it with --bootstrap, instead of failing the import
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Prefer lxml (libxml2) for parsing GPX input when it is installed
+try:
+    from lxml import etree as gpx_etree
+
+    GPX_PARSE_ERRORS = (gpx_etree.XMLSyntaxError, ET.ParseError)
+except ImportError:
+    gpx_etree = None
+    GPX_PARSE_ERRORS = (ET.ParseError,)
+
+# Latitude and longitude separated by a comma, semicolon or whitespace
+COORDINATE_NUMBER = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+COORDINATE_PATTERN = re.compile(
+    rf"\s*({COORDINATE_NUMBER})\s*[,;\s]\s*({COORDINATE_NUMBER})\s*"
+)
+
+
+@dataclass
+class RoutePoints:
+    """GPX points stored as parallel arrays indexed by point position"""
+
+    lats: np.ndarray
+    lons: np.ndarray
+    eles: list
+    times: list
+    cumulative_distance: np.ndarray
+
+    def __len__(self):
+        return len(self.lats)
+
+    def coords(self, index):
+        """Return the (lat, lon) tuple of the point at the given index"""
+        return float(self.lats[index]), float(self.lons[index])
+
+    @cached_property
+    def lats_radians(self):
+        return np.radians(self.lats)
+
+    @cached_property
+    def lons_radians(self):
+        return np.radians(self.lons)
+
+    @cached_property
+    def parsed_times(self):
+        return parse_gpx_times(self.times)
+
+
+def create_route_points(lats, lons, eles, times):
+    """Create route points from the raw lat/lon strings and ele/time texts"""
+    # Let numpy convert the raw attribute strings instead of float() per point
+    lats = np.array(lats, dtype=np.float64)
+    lons = np.array(lons, dtype=np.float64)
+    return RoutePoints(lats, lons, eles, times, np.zeros(len(lats)))
 
 
 def get_user_input(prompt, default):
@@ -132,6 +362,20 @@ def get_user_input(prompt, default):
     return user_input if user_input else default
 
 
+def parse_user_time(text):
+    """Parse a YYYY-MM-DDTHH:MM time entered by the user, exiting if it is invalid"""
+    try:
+        value = datetime.fromisoformat(text.strip().translate(USER_TIME_TRANSLATION))
+    except ValueError:
+        print(f"Invalid date format. Please use YYYY-MM-DDTHH:MM")
+        sys.exit(1)
+
+    # Times with an offset are converted to naive UTC like the GPX times
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 def format_map_link(lat, lon):
     """Create a Google Maps link for coordinates"""
     return f"https://www.google.com/maps?q={lat},{lon}"
@@ -140,10 +384,10 @@ def format_map_link(lat, lon):
 def format_route_link(all_points, sleep_stops):
     """Create a Google Maps route link for the entire route with waypoints and walking mode"""
     # Start point
-    start_lat, start_lon = all_points[0]["coords"]
+    start_lat, start_lon = all_points.coords(0)
 
     # End point
-    end_lat, end_lon = all_points[-1]["coords"]
+    end_lat, end_lon = all_points.coords(-1)
 
     # Build the URL using Google Maps Directions API format
     base_url = "https://www.google.com/maps/dir/?api=1"
@@ -159,7 +403,7 @@ def format_route_link(all_points, sleep_stops):
     if sleep_stops:
         waypoints = []
         for stop in sleep_stops:
-            lat, lon = stop["point"]["coords"]
+            lat, lon = all_points.coords(stop["index"])
             waypoints.append(f"{lat},{lon}")
 
         if waypoints:
@@ -180,142 +424,193 @@ def format_route_link(all_points, sleep_stops):
     return full_url
 
 
-def find_closest_point(points, target_distance):
-    """Find the point closest to a target cumulative distance"""
-    closest_point = None
-    min_diff = float("inf")
+def find_closest_indices(cumulative_distance, target_distances):
+    """Find the indices of the points closest to an array of target distances"""
+    # Cumulative distance never decreases along the route, so a binary search
+    # finds the first point at or beyond each target
+    indices = np.searchsorted(cumulative_distance, target_distances)
+
+    # Pick whichever neighbour of each target is closer (earlier point on ties)
+    after = cumulative_distance[np.minimum(indices, len(cumulative_distance) - 1)]
+    before = cumulative_distance[np.maximum(indices - 1, 0)]
+    use_before = (indices == len(cumulative_distance)) | (
+        (indices > 0) & (target_distances - before <= after - target_distances)
+    )
+    indices = indices - use_before
+
+    # Use the first of any points sharing that distance (zero-length segments)
+    return np.searchsorted(cumulative_distance, cumulative_distance[indices])
 
-    for point in points:
-        diff = abs(point["cumulative_distance"] - target_distance)
-        if diff < min_diff:
-            min_diff = diff
-            closest_point = point
 
-    return closest_point
+def calculate_sleep_stops(cumulative_distance, daily_distance, num_nights):
+    """Place a sleep stop at the point closest to each multiple of the daily distance"""
+    target_distances = daily_distance * np.arange(1, num_nights + 1)
+    indices = find_closest_indices(cumulative_distance, target_distances)
+    return [
+        {"night": night, "index": index, "target_distance": target_distance}
+        for night, index, target_distance in zip(
+            range(1, num_nights + 1), indices.tolist(), target_distances.tolist()
+        )
+    ]
+
+
+def find_nearest_index(all_points, lat, lon):
+    """Find the point nearest to the given coordinates, returns (index, distance in km)"""
+    phi0 = math.radians(lat)
+    lam0 = math.radians(lon)
+    phi = all_points.lats_radians
+    lam = all_points.lons_radians
+
+    # Equirectangular projection around the coordinates: picking the nearest
+    # point needs no trigonometry per point, only a scaled squared distance
+    dlam = np.abs(lam - lam0)
+    dlam = np.minimum(dlam, 2 * math.pi - dlam)  # the short way around
+    dx = dlam * math.cos(phi0)
+    dy = phi - phi0
+    index = int(np.argmin(dx * dx + dy * dy))
+
+    # Only the nearest point needs the haversine distance, in scalar math
+    dphi = phi[index] - phi0
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi0) * math.cos(phi[index]) * math.sin(dlam[index] / 2) ** 2
+    )
+    return index, 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
 
 
 def safe_geodesic(point1, point2):
     """Calculate geodesic distance with error handling"""
-    try:
-        return geodesic(point1, point2).km
-    except Exception as e:
-        # Fallback to simple Euclidean approximation
-        lat_diff = point2[0] - point1[0]
-        lon_diff = point2[1] - point1[1]
-        return ((lat_diff**2 + lon_diff**2) ** 0.5) * 111  # Rough km conversion
+    # Repeated points (GPS stalls, pauses) are common in recorded tracks
+    if point1 == point2:
+        return 0.0
 
+    from geopy.distance import geodesic
 
-def calculate_distances_vectorized(points):
-    """Calculate distances using vectorized operations with numpy"""
-    if len(points) < 2:
-        return np.array([0.0])
+    try:
+        return geodesic(point1, point2).km
+    except ValueError:
+        # geopy rejects out-of-range coordinates, so fall back to the
+        # haversine distance in scalar math
+        phi1 = math.radians(point1[0])
+        phi2 = math.radians(point2[0])
+        dlam = math.radians(point2[1] - point1[1])
+        a = (
+            math.sin((phi2 - phi1) / 2) ** 2
+            + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
 
-    # Extract coordinates as numpy array
-    coords = np.array([point["coords"] for point in points])
 
-    # Calculate differences between consecutive points
-    lat_diff = np.diff(coords[:, 0])
-    lon_diff = np.diff(coords[:, 1])
+def calculate_distances_vectorized(lats, lons):
+    """Calculate cumulative distances with a vectorized haversine over all segments"""
+    if len(lats) < 2:
+        return np.zeros(len(lats))
 
-    # More accurate distance calculation using Haversine-like approximation
-    # Convert to radians
-    lat_rad = np.radians(coords[:-1, 0])
-    lat_diff_rad = np.radians(lat_diff)
-    lon_diff_rad = np.radians(lon_diff)
+    # Convert coordinates to radians once
+    phi = np.radians(lats)
+    lam = np.radians(lons)
 
-    # Haversine formula approximation
-    # For small distances, this is quite accurate
+    # Haversine formula for every pair of consecutive points
+    dphi = np.diff(phi)
+    dlam = np.diff(lam)
     a = (
-        np.sin(lat_diff_rad / 2) ** 2
-        + np.cos(lat_rad)
-        * np.cos(lat_rad + lat_diff_rad)
-        * np.sin(lon_diff_rad / 2) ** 2
+        np.sin(dphi / 2) ** 2
+        + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(dlam / 2) ** 2
     )
-    distances = 2 * 6371 * np.arcsin(np.sqrt(a))  # Earth radius = 6371 km
+    # Finish the distances in place on the haversine term's buffer
+    np.sqrt(a, out=a)
+    np.arcsin(a, out=a)
+    a *= 2 * EARTH_RADIUS_KM
+
+    # Return cumulative distances, summed straight into the result
+    cumulative_distance = np.empty(len(lats))
+    cumulative_distance[0] = 0.0
+    np.cumsum(a, out=cumulative_distance[1:])
+    return cumulative_distance
+
+
+def calculate_distances_geodesic(lats, lons):
+    """Calculate cumulative WGS84 geodesic distances using pyproj or geopy"""
+    # Prefer pyproj's compiled geodesic implementation over geopy when installed
+    try:
+        from pyproj import Geod
+    except ImportError:
+        Geod = None
 
-    # Return cumulative distances
-    return np.concatenate(([0], np.cumsum(distances)))
+    if Geod is not None:
+        if len(lats) < 2:
+            return np.zeros(len(lats))
 
+        # WGS84 geodesic distances for all segments in one call
+        _, _, segment_meters = Geod(ellps="WGS84").inv(
+            lons[:-1], lats[:-1], lons[1:], lats[1:]
+        )
+        return np.concatenate(([0.0], np.cumsum(segment_meters) / 1000.0))
+
+    if find_spec("geopy") is None:
+        print(f"Error: Geodesic distances require pyproj or geopy")
+        print(f"   pip install pyproj")
+        sys.exit(1)
 
-def calculate_distances_fallback(points):
-    """Fallback distance calculation using geopy for accuracy"""
     distances = [0.0]
     total_distance = 0.0
 
-    for i in range(1, len(points)):
-        dist = safe_geodesic(points[i - 1]["coords"], points[i]["coords"])
+    for i in range(1, len(lats)):
+        dist = safe_geodesic((lats[i - 1], lons[i - 1]), (lats[i], lons[i]))
         total_distance += dist
         distances.append(total_distance)
 
     return np.array(distances)
 
 
-def calculate_cumulative_distances(all_points):
-    """Calculate cumulative distances with vectorized operations when possible"""
+def calculate_cumulative_distances(all_points, geodesic=False):
+    """Calculate cumulative distances with a vectorized haversine calculation"""
     num_points = len(all_points)
 
-    print(f"\nCalculating route distance...")
+    if geodesic:
+        print(f"\nCalculating route distance (WGS84 geodesic)...")
+        all_points.cumulative_distance = calculate_distances_geodesic(
+            all_points.lats, all_points.lons
+        )
+        print(f"Distance calculation completed for {num_points} points")
+        return all_points.cumulative_distance[-1]
 
-    # For small files or when high accuracy is needed, use geopy
-    # For large files, use vectorized calculation for speed
-    use_vectorized = num_points > 1000
+    print(f"\nCalculating route distance...")
 
     try:
-        if use_vectorized:
-            print(f"Using fast vectorized calculation for large GPX file...")
-            distances = calculate_distances_vectorized(all_points)
-        else:
-            print(f"Using high-accuracy calculation...")
-            distances = calculate_distances_fallback(all_points)
-
-        # Assign distances to points
-        for i, point in enumerate(all_points):
-            point["cumulative_distance"] = distances[i]
-
-        total_distance = distances[-1]
+        all_points.cumulative_distance = calculate_distances_vectorized(
+            all_points.lats, all_points.lons
+        )
+        total_distance = all_points.cumulative_distance[-1]
 
-        if use_vectorized:
-            print(f"Fast calculation completed for {num_points} points")
-        else:
-            print(f"High-accuracy calculation completed for {num_points} points")
+        print(f"Distance calculation completed for {num_points} points")
 
     except Exception as e:
-        print(f"Error in vectorized calculation, falling back to point-by-point: {e}")
-        # Fallback to original method
-        total_distance = 0
-
-        for i in range(num_points):
-            if i > 0:
-                dist = safe_geodesic(
-                    all_points[i - 1]["coords"], all_points[i]["coords"]
-                )
-                total_distance += dist
-            all_points[i]["cumulative_distance"] = total_distance
-
-            # Show progress for large files
-            if num_points > 1000 and i % 100 == 0:
-                progress = (i / num_points) * 100
-                print(f"\rProgress: {progress:.1f}% ({i}/{num_points} points)", end="")
-
-        if num_points > 1000:
-            print(f"\rProgress: 100.0% ({num_points}/{num_points} points) - Done!")
+        print(f"Error in vectorized calculation, falling back to geodesic: {e}")
+        all_points.cumulative_distance = calculate_distances_geodesic(
+            all_points.lats, all_points.lons
+        )
+        total_distance = all_points.cumulative_distance[-1]
 
     return total_distance
 
 
-def display_sleep_stops(sleep_stops, total_distance, title="Sleep-over locations:"):
+def display_sleep_stops(
+    all_points, sleep_stops, total_distance, title="Sleep-over locations:"
+):
     """Display sleep stops in a consistent format"""
+    cumulative_distance = all_points.cumulative_distance
     print(f"\n{title}")
     for i, stop in enumerate(sleep_stops):
-        lat, lon = stop["point"]["coords"]
-        actual_dist = stop["point"]["cumulative_distance"]
+        lat, lon = all_points.coords(stop["index"])
+        actual_dist = cumulative_distance[stop["index"]]
 
         # Calculate today's distance
         if i == 0:
             today_distance = actual_dist
         else:
             today_distance = (
-                actual_dist - sleep_stops[i - 1]["point"]["cumulative_distance"]
+                actual_dist - cumulative_distance[sleep_stops[i - 1]["index"]]
             )
 
         # Calculate remaining distance
@@ -331,206 +626,400 @@ def display_sleep_stops(sleep_stops, total_distance, title="Sleep-over locations
 
 def parse_coordinates(coord_string):
     """Parse coordinates in various formats"""
-    coord_string = coord_string.strip()
-
-    # Try different separators
-    for separator in [",", " ", ";", "\t"]:
-        if separator in coord_string:
-            parts = coord_string.split(separator)
-            if len(parts) == 2:
-                try:
-                    lat = float(parts[0].strip())
-                    lon = float(parts[1].strip())
-                    # Validate coordinate ranges
-                    if -90 <= lat <= 90 and -180 <= lon <= 180:
-                        return lat, lon
-                except ValueError:
-                    continue
+    match = COORDINATE_PATTERN.fullmatch(coord_string)
+    if match:
+        lat, lon = float(match[1]), float(match[2])
+        # Validate coordinate ranges
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon
 
     raise ValueError(
         "Could not parse coordinates. Use format: lat,lon (e.g., 56.123,12.456)"
     )
 
 
-def load_gpx_content(source):
-    """Load GPX content from either a URL or local file path"""
-    # Check if it's a URL
-    parsed = urlparse(source)
-    is_url = parsed.scheme in ("http", "https")
+def is_url(source):
+    """Check whether a GPX source is an http(s) URL rather than a file path"""
+    return source[:8].lower().startswith(("http://", "https://"))
 
-    if is_url:
-        print(f"\nDownloading GPX file from URL...")
-        try:
-            response = requests.get(source)
+
+@lru_cache(maxsize=None)
+def get_http_session():
+    """Return a shared requests session, cached on disk when requests-cache is installed"""
+    import requests
+
+    if os.environ.get("GPX_ROUTE_TIMER_NO_CACHE"):
+        return requests.Session()
+
+    try:
+        import requests_cache
+    except ImportError:
+        return requests.Session()
+
+    # Revalidate with ETag/Last-Modified so unchanged files are not re-downloaded
+    return requests_cache.CachedSession(
+        "gpx-route-timer",
+        use_cache_dir=True,
+        cache_control=True,
+        always_revalidate=True,
+    )
+
+
+def open_gpx_file(source):
+    """Open a local GPX file for binary reading"""
+    print(f"\nLoading GPX file from local path...")
+    try:
+        # Expand user home directory if needed
+        file_path = os.path.expanduser(source)
+        return open(file_path, "rb")
+    except FileNotFoundError:
+        print(f"Error: File not found: {file_path}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+
+
+def load_and_parse_gpx(source):
+    """Load GPX content from either a URL or local file path and parse it"""
+    if not is_url(source):
+        with open_gpx_file(source) as gpx_file:
+            if os.environ.get("GPX_ROUTE_TIMER_NO_CACHE"):
+                # No cache key to compute, so parse straight from the file
+                return parse_gpx(gpx_file)
+            return parse_gpx_cached(gpx_file.read())
+
+    import requests
+    import urllib3
+
+    print(f"\nDownloading GPX file from URL...")
+    try:
+        with get_http_session().get(
+            source, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS
+        ) as response:
             response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException as e:
-            print(f"Error downloading file: {e}")
-            sys.exit(1)
-    else:
-        # Treat as local file path
-        print(f"\nLoading GPX file from local path...")
-        try:
-            # Expand user home directory if needed
-            file_path = os.path.expanduser(source)
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
-        except FileNotFoundError:
-            print(f"Error: File not found: {file_path}")
-            sys.exit(1)
-        except Exception as e:
-            print(f"Error reading file: {e}")
-            sys.exit(1)
+            if getattr(response, "from_cache", None) is None:
+                # Without a local copy of the body, parse it while it arrives
+                response.raw.decode_content = True
+                return parse_gpx(response.raw)
+            # requests-cache keeps the whole body, so reuse the parsed points cache
+            gpx_xml = response.content
+    except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
+        print(f"Error downloading file: {e}")
+        sys.exit(1)
+
+    return parse_gpx_cached(gpx_xml)
 
 
-def detect_gpx_type(root):
-    """Detect the type of GPX content and return waypoints, tracks, or routes"""
-    waypoints = root.findall(f".//{{{GPX_NAMESPACE}}}wpt")
-    tracks = root.findall(f".//{{{GPX_NAMESPACE}}}trk")
-    routes = root.findall(f".//{{{GPX_NAMESPACE}}}rte")
+def parse_gpx(gpx_file):
+    """Stream a binary GPX file object and return its type, route points and metadata name"""
+    # Raw lat, lon, ele and time values for each kind of GPX point
+    point_values = {
+        GPX_WPT: ([], [], [], []),
+        GPX_RTEPT: ([], [], [], []),
+        GPX_TRKPT: ([], [], [], []),
+    }
+    has_routes = False
+    has_tracks = False
+    metadata_name = None
+
+    if gpx_etree is not None:
+        events = gpx_etree.iterparse(gpx_file, events=("end",), resolve_entities=False)
+    else:
+        events = ET.iterparse(gpx_file, events=("end",))
+
+    # Single streaming pass: copy the values out of each point and clear
+    # points and containers as soon as they have been consumed
+    for _, elem in events:
+        tag = elem.tag
+        if tag in GPX_COMPATIBLE_TAGS:
+            # Rename GPX 1.0 and un-namespaced elements to their GPX 1.1 tags
+            tag = elem.tag = GPX_COMPATIBLE_TAGS[tag]
+
+        if tag in point_values:
+            lats, lons, eles, times = point_values[tag]
+            lats.append(elem.get("lat"))
+            lons.append(elem.get("lon"))
+            eles.append(elem.findtext(GPX_ELE))
+            times.append(elem.findtext(GPX_TIME))
+            elem.clear()
+            # Clearing leaves the empty point attached to its segment, so
+            # with lxml also drop the points already read. Waypoints are kept
+            # because their siblings include the GPX 1.0 name read at the end
+            if gpx_etree is not None and tag != GPX_WPT:
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+        elif tag == GPX_TRKSEG or tag == GPX_TRK:
+            has_tracks = True
+            elem.clear()
+        elif tag == GPX_RTE:
+            has_routes = True
+            elem.clear()
+        elif tag == GPX_METADATA:
+            name = elem.find(GPX_NAME)
+            if metadata_name is None and name is not None and name.text:
+                metadata_name = name.text.strip()
+        elif tag == GPX_ROOT and metadata_name is None:
+            # GPX 1.0 keeps the name directly under the root element
+            name = elem.find(GPX_NAME)
+            if name is not None and name.text:
+                metadata_name = name.text.strip()
 
     # Return in order of preference: routes, tracks, waypoints
-    if routes:
-        return "route", routes
-    elif tracks:
-        return "track", tracks
-    elif waypoints:
-        return "waypoint", waypoints
+    if has_routes:
+        gpx_type, tag = "route", GPX_RTEPT
+    elif has_tracks:
+        gpx_type, tag = "track", GPX_TRKPT
+    elif point_values[GPX_WPT][0]:
+        gpx_type, tag = "waypoint", GPX_WPT
     else:
-        return "none", []
+        return "none", None, metadata_name
 
+    return gpx_type, create_route_points(*point_values[tag]), metadata_name
 
-def extract_points_from_waypoints(waypoints):
-    """Convert waypoints to track-like points"""
-    all_points = []
-    for wpt in waypoints:
-        lat = float(wpt.get("lat"))
-        lon = float(wpt.get("lon"))
-        all_points.append(
-            {"element": wpt, "coords": (lat, lon), "cumulative_distance": 0}
-        )
-    return all_points
-
-
-def extract_points_from_routes(routes):
-    """Extract points from route elements"""
-    all_points = []
-    for rte in routes:
-        for pt in rte.findall(f".//{{{GPX_NAMESPACE}}}rtept"):
-            lat = float(pt.get("lat"))
-            lon = float(pt.get("lon"))
-            all_points.append(
-                {"element": pt, "coords": (lat, lon), "cumulative_distance": 0}
+
+def get_cache_dir():
+    """Return the directory used for cached data"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "gpx-route-timer")
+
+
+def encode_optional_texts(values):
+    """Encode a list of optional strings as a string array and a presence mask"""
+    texts = np.array(["" if value is None else value for value in values], dtype=str)
+    present = np.array([value is not None for value in values], dtype=bool)
+    return texts, present
+
+
+def decode_optional_texts(texts, present):
+    """Decode a string array and presence mask back into a list of optional strings"""
+    return [
+        text if is_present else None
+        for text, is_present in zip(texts.tolist(), present.tolist())
+    ]
+
+
+def parse_gpx_cached(gpx_xml):
+    """Parse GPX content, reusing the parsed points cached on disk for identical content"""
+    if os.environ.get("GPX_ROUTE_TIMER_NO_CACHE"):
+        return parse_gpx(io.BytesIO(gpx_xml))
+
+    # Key the cache on the program version and the exact GPX content
+    content_hash = hashlib.blake2b(__version__.encode(), digest_size=16)
+    content_hash.update(gpx_xml)
+    cache_file = os.path.join(get_cache_dir(), f"{content_hash.hexdigest()}.npz")
+
+    try:
+        with np.load(cache_file) as cached:
+            all_points = RoutePoints(
+                cached["lats"],
+                cached["lons"],
+                decode_optional_texts(cached["eles"], cached["has_ele"]),
+                decode_optional_texts(cached["times"], cached["has_time"]),
+                np.zeros(len(cached["lats"])),
             )
-    return all_points
-
-
-def extract_points_from_tracks(tracks):
-    """Extract points from track elements"""
-    all_points = []
-    for trk in tracks:
-        for seg in trk.findall(f".//{{{GPX_NAMESPACE}}}trkseg"):
-            for pt in seg.findall(f".//{{{GPX_NAMESPACE}}}trkpt"):
-                lat = float(pt.get("lat"))
-                lon = float(pt.get("lon"))
-                all_points.append(
-                    {"element": pt, "coords": (lat, lon), "cumulative_distance": 0}
-                )
-    return all_points
+            metadata_name = str(cached["metadata_name"]) or None
+            return str(cached["gpx_type"]), all_points, metadata_name
+    except FileNotFoundError:
+        pass
+    except Exception:
+        # A truncated or corrupt entry is removed and rebuilt below
+        try:
+            os.remove(cache_file)
+        except OSError:
+            pass
+
+    gpx_type, all_points, metadata_name = parse_gpx(io.BytesIO(gpx_xml))
+    if gpx_type == "none":
+        return gpx_type, all_points, metadata_name
+
+    # Saving is best effort, a failure only means the next run parses again.
+    # The entry is written to a temporary file and renamed into place, so an
+    # interrupted save never leaves a partial cache file behind.
+    eles, has_ele = encode_optional_texts(all_points.eles)
+    times, has_time = encode_optional_texts(all_points.times)
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        with open(temp_file, "wb") as f:
+            np.savez_compressed(
+                f,
+                gpx_type=gpx_type,
+                metadata_name=metadata_name or "",
+                lats=all_points.lats,
+                lons=all_points.lons,
+                eles=eles,
+                has_ele=has_ele,
+                times=times,
+                has_time=has_time,
+            )
+        os.replace(temp_file, cache_file)
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
 
+    return gpx_type, all_points, metadata_name
+
+
+def to_datetime64(value):
+    """Convert a datetime to a naive numpy datetime64 with microsecond precision"""
+    return np.datetime64(value.replace(tzinfo=None), "us")
+
+
+def parse_gpx_time(text):
+    """Parse a single GPX time text into a UTC datetime64, NaT if it is invalid"""
+    try:
+        value = datetime.fromisoformat(text)
+    except ValueError:
+        return np.datetime64("NaT", "us")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return to_datetime64(value)
 
-def create_komoot_compatible_gpx(
-    all_points, sleep_stops, start_time, end_time, walking_speed, route_name
-):
-    """Create a new GPX structure with routes that matches Komoot's expected format"""
-    # Create root element with proper attributes
-    root = ET.Element("gpx")
-    root.set("version", "1.1")
-    root.set("creator", GITHUB_URL)
-    root.set("xmlns", GPX_NAMESPACE)
-    root.set("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance")
-    root.set(
-        "xsi:schemaLocation",
-        f"{GPX_NAMESPACE} {GPX_NAMESPACE}/gpx.xsd",
-    )
 
-    # Add metadata
-    metadata = ET.SubElement(root, "metadata")
-    name = ET.SubElement(metadata, "name")
-    name.text = route_name
-
-    author = ET.SubElement(metadata, "author")
-    link = ET.SubElement(author, "link")
-    link.set("href", GITHUB_URL)
-    link_text = ET.SubElement(link, "text")
-    link_text.text = "GPX Route Timer"
-    link_type = ET.SubElement(link, "type")
-    link_type.text = "text/html"
-
-    # Add creation time
-    time_elem = ET.SubElement(metadata, "time")
-    time_elem.text = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-    # Add route (instead of track)
-    rte = ET.SubElement(root, "rte")
-    rte_name = ET.SubElement(rte, "name")
-    rte_name.text = route_name
-
-    # Calculate actual walking schedule and add route points
-    current_day = 0
-    day_start_time = start_time
-    day_distance_walked = 0
+def parse_gpx_times(times):
+    """Parse GPX time texts into a datetime64 array, NaT where missing or invalid"""
+    texts = [text.rstrip("Z") if text else "NaT" for text in times]
+    try:
+        with warnings.catch_warnings():
+            # numpy warns when it converts times with a UTC offset to UTC
+            warnings.simplefilter("ignore")
+            return np.array(texts, dtype="datetime64[us]")
+    except ValueError:
+        # Some value numpy cannot parse, fall back to parsing one by one
+        return np.array([parse_gpx_time(text) for text in texts])
+
+
+def hours_to_timedelta64(hours):
+    """Convert an array of hours to numpy timedelta64 values in microseconds"""
+    return np.rint(np.asarray(hours) * 3_600_000_000).astype("timedelta64[us]")
+
+
+def format_gpx_times(times):
+    """Format datetime64 values as GPX timestamps with exactly 3 decimal places"""
+    # Format: YYYY-MM-DDTHH:MM:SS.sssZ, with the "Z" suffix added by numpy
+    return np.datetime_as_string(times, unit="ms", timezone="UTC").tolist()
+
+
+def calculate_day_distances(cumulative_distance, sleep_stops, total_distance):
+    """Return the distance walked on each day, split at the sleep stops"""
+    stop_indices = [stop["index"] for stop in sleep_stops]
+    return np.diff(
+        np.concatenate(([0.0], cumulative_distance[stop_indices], [total_distance]))
+    ).tolist()
+
+
+def calculate_day_start_times(start_time, end_time, day_distances, walking_speed):
+    """Return the start time of each day for the itinerary"""
+    # The first day starts at the start time and the days in between at 9:00
+    day_start_times = [start_time]
+    for day in range(1, len(day_distances) - 1):
+        day_start_times.append(
+            (start_time + timedelta(days=day)).replace(
+                hour=DEFAULT_START_HOUR, minute=0
+            )
+        )
+
+    # The last day is timed backwards from the end time
+    if len(day_distances) > 1:
+        last_hours = day_distances[-1] / walking_speed
+        day_start_times.append(end_time - timedelta(hours=last_hours))
+    return day_start_times
+
+
+def calculate_point_times(all_points, sleep_stops, start_time, end_time, walking_speed):
+    """Calculate the planned time at every route point as a datetime64 array"""
+    cumulative_distance = all_points.cumulative_distance
 
     # Calculate total days
     total_days = len(sleep_stops) + 1 if sleep_stops else 1
 
-    for i, point in enumerate(all_points):
-        # Check if we've reached a sleep stop
-        for stop in sleep_stops:
-            if i > 0 and stop["point"] == point:
-                # Start new day
-                current_day += 1
-                # For middle days, always start at 9:00
-                if current_day < total_days - 1:
-                    day_start_time = start_time.replace(
-                        hour=DEFAULT_START_HOUR, minute=0, second=0, microsecond=0
-                    ) + timedelta(days=current_day)
-                else:
-                    # Last day - calculate start time based on end time and remaining distance
-                    remaining_distance = (
-                        all_points[-1]["cumulative_distance"]
-                        - point["cumulative_distance"]
-                    )
-                    hours_needed = remaining_distance / walking_speed
-                    day_start_time = end_time - timedelta(hours=hours_needed)
-                    day_start_time = day_start_time.replace(microsecond=0)
+    # A sleep stop at index i starts a new day from point i onwards
+    stop_indices = np.sort(
+        np.array(
+            [stop["index"] for stop in sleep_stops if stop["index"] > 0], dtype=np.intp
+        )
+    )
+    day_number = np.searchsorted(stop_indices, np.arange(len(all_points)), side="right")
 
-                day_distance_walked = point["cumulative_distance"]
+    day_start_times = [to_datetime64(start_time)]
+    day_start_distances = [0.0]
+    for day, index in enumerate(stop_indices, start=1):
+        # For middle days, always start at 9:00
+        if day < total_days - 1:
+            day_start_time = start_time.replace(
+                hour=DEFAULT_START_HOUR, minute=0, second=0, microsecond=0
+            ) + timedelta(days=day)
+        else:
+            # Last day - calculate start time based on end time and remaining distance
+            remaining_distance = cumulative_distance[-1] - cumulative_distance[index]
+            hours_needed = remaining_distance / walking_speed
+            day_start_time = end_time - timedelta(hours=hours_needed)
+            day_start_time = day_start_time.replace(microsecond=0)
 
-        # Calculate time for this point
-        distance_today = point["cumulative_distance"] - day_distance_walked
-        hours_today = distance_today / walking_speed
-        current_time = day_start_time + timedelta(hours=hours_today)
+        day_start_times.append(to_datetime64(day_start_time))
+        day_start_distances.append(cumulative_distance[index])
 
-        # Create route point (rtept instead of trkpt)
-        rtept = ET.SubElement(rte, "rtept")
-        rtept.set("lat", str(point["coords"][0]))
-        rtept.set("lon", str(point["coords"][1]))
+    # Time for each point is its day's start plus the distance walked that day
+    distance_today = cumulative_distance - np.array(day_start_distances)[day_number]
+    return np.array(day_start_times)[day_number] + hours_to_timedelta64(
+        distance_today / walking_speed
+    )
 
-        # Add elevation if it exists
-        ele_elem = point["element"].find(".//ele")
-        if ele_elem is None:
-            ele_elem = point["element"].find(f".//{{{GPX_NAMESPACE}}}ele")
-        if ele_elem is not None:
-            ele = ET.SubElement(rtept, "ele")
-            ele.text = ele_elem.text
 
-        # Add time with exactly 3 decimal places for milliseconds
-        time_elem = ET.SubElement(rtept, "time")
-        # Format: YYYY-MM-DDTHH:MM:SS.sssZ
-        time_elem.text = current_time.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+def format_gpx_route(route_name, created, lats, lons, eles, times):
+    """Yield the text of a GPX route document that matches Komoot's expected format"""
+    name = escape(route_name)
 
-    return root
+    # Root element with proper attributes, metadata and route (instead of track)
+    yield GPX_ROUTE_HEADER.format(name=name, created=created)
+
+    # Route points (rtept instead of trkpt), one chunk per point so the
+    # document is written out as it is formatted, never held as a whole
+    for lat, lon, ele, time in zip(lats, lons, eles, times):
+        if ele:
+            ele_line = f"\t\t\t<ele>{escape(ele)}</ele>\n"
+        elif ele is not None:
+            ele_line = "\t\t\t<ele />\n"
+        else:
+            ele_line = ""
+        yield (
+            f'\t\t<rtept lat="{lat}" lon="{lon}">\n'
+            f"{ele_line}\t\t\t<time>{time}</time>\n\t\t</rtept>\n"
+        )
+
+    yield GPX_ROUTE_FOOTER
+
+
+def format_gpx_creation_time():
+    """Format the current UTC time for the GPX metadata of new files"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def create_komoot_compatible_gpx(
+    all_points, sleep_stops, start_time, end_time, walking_speed, route_name
+):
+    """Create the GPX route document text chunks that match Komoot's expected format"""
+    # Calculate actual walking schedule for all route points at once
+    point_times = format_gpx_times(
+        calculate_point_times(
+            all_points, sleep_stops, start_time, end_time, walking_speed
+        )
+    )
+
+    return format_gpx_route(
+        route_name,
+        format_gpx_creation_time(),
+        all_points.lats.tolist(),
+        all_points.lons.tolist(),
+        all_points.eles,
+        point_times,
+    )
 
 
 def create_daily_gpx_files(
@@ -553,21 +1042,24 @@ def create_daily_gpx_files(
 
     # Add sleep stop indices as day boundaries
     for stop in sleep_stops:
-        for i, point in enumerate(all_points):
-            if point == stop["point"]:
-                day_boundaries.append(i)
-                break
+        day_boundaries.append(stop["index"])
 
     # Add last point as final boundary
     day_boundaries.append(len(all_points) - 1)
 
+    cumulative_distance = all_points.cumulative_distance
+
+    # All daily files share one creation time
+    created = format_gpx_creation_time()
+
     # Create GPX file for each day
     for day_num in range(total_days):
         start_idx = day_boundaries[day_num]
         end_idx = day_boundaries[day_num + 1]
 
-        # Get points for this day
-        day_points = all_points[start_idx : end_idx + 1]
+        # Get point indices for this day
+        day_points = slice(start_idx, end_idx + 1)
+        day_distance = cumulative_distance[end_idx] - cumulative_distance[start_idx]
 
         # Calculate day start and end times
         if day_num == 0:
@@ -584,84 +1076,36 @@ def create_daily_gpx_files(
             day_end_time = end_time
         else:
             # Calculate end time based on distance and walking speed
-            day_distance = (
-                day_points[-1]["cumulative_distance"]
-                - day_points[0]["cumulative_distance"]
-            )
             day_hours = day_distance / walking_speed
             day_end_time = day_start_time + timedelta(hours=day_hours)
 
         # Create day-specific route name
         day_route_name = f"{route_name} - Day {day_num + 1}"
 
-        # Create GPX structure for this day
-        root = ET.Element("gpx")
-        root.set("version", "1.1")
-        root.set("creator", GITHUB_URL)
-        root.set("xmlns", GPX_NAMESPACE)
-        root.set("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance")
-        root.set(
-            "xsi:schemaLocation",
-            f"{GPX_NAMESPACE} {GPX_NAMESPACE}/gpx.xsd",
+        # Calculate time for each point within the day
+        distance_from_day_start = (
+            cumulative_distance[day_points] - cumulative_distance[start_idx]
+        )
+        point_times = format_gpx_times(
+            to_datetime64(day_start_time)
+            + hours_to_timedelta64(distance_from_day_start / walking_speed)
         )
-
-        # Add metadata
-        metadata = ET.SubElement(root, "metadata")
-        name = ET.SubElement(metadata, "name")
-        name.text = day_route_name
-
-        author = ET.SubElement(metadata, "author")
-        link = ET.SubElement(author, "link")
-        link.set("href", GITHUB_URL)
-        link_text = ET.SubElement(link, "text")
-        link_text.text = "GPX Route Timer"
-        link_type = ET.SubElement(link, "type")
-        link_type.text = "text/html"
-
-        # Add creation time
-        time_elem = ET.SubElement(metadata, "time")
-        time_elem.text = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        # Add route
-        rte = ET.SubElement(root, "rte")
-        rte_name = ET.SubElement(rte, "name")
-        rte_name.text = day_route_name
-
-        # Add route points with timestamps
-        day_distance_start = day_points[0]["cumulative_distance"]
-
-        for point in day_points:
-            # Calculate time for this point within the day
-            distance_from_day_start = point["cumulative_distance"] - day_distance_start
-            hours_from_day_start = distance_from_day_start / walking_speed
-            current_time = day_start_time + timedelta(hours=hours_from_day_start)
-
-            # Create route point
-            rtept = ET.SubElement(rte, "rtept")
-            rtept.set("lat", str(point["coords"][0]))
-            rtept.set("lon", str(point["coords"][1]))
-
-            # Add elevation if it exists
-            ele_elem = point["element"].find(".//ele")
-            if ele_elem is None:
-                ele_elem = point["element"].find(f".//{{{GPX_NAMESPACE}}}ele")
-            if ele_elem is not None:
-                ele = ET.SubElement(rtept, "ele")
-                ele.text = ele_elem.text
-
-            # Add time
-            time_elem = ET.SubElement(rtept, "time")
-            time_elem.text = current_time.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-
-        # Pretty print the XML
-        indent_xml(root)
 
         # Generate filename for this day
         day_filename = f"{base_filename}--day-{day_num + 1:02d}.gpx"
 
         # Save the day's GPX file
-        tree = ET.ElementTree(root)
-        tree.write(day_filename, xml_declaration=True, encoding="UTF-8", method="xml")
+        write_gpx_file(
+            day_filename,
+            format_gpx_route(
+                day_route_name,
+                created,
+                all_points.lats[day_points].tolist(),
+                all_points.lons[day_points].tolist(),
+                all_points.eles[day_points],
+                point_times,
+            ),
+        )
 
         daily_files.append(
             {
@@ -669,43 +1113,33 @@ def create_daily_gpx_files(
                 "day": day_num + 1,
                 "start_time": day_start_time,
                 "end_time": day_end_time,
-                "distance": day_points[-1]["cumulative_distance"]
-                - day_points[0]["cumulative_distance"],
-                "points": len(day_points),
+                "distance": day_distance,
+                "points": end_idx - start_idx + 1,
             }
         )
 
     return daily_files
 
 
-def indent_xml(elem, level=0):
-    """Add pretty printing to XML"""
-    i = "\n" + level * "\t"
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "\t"
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for child in elem:
-            indent_xml(child, level + 1)
-        if not child.tail or not child.tail.strip():
-            child.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
+def write_gpx_file(filename, chunks):
+    """Write GPX document text chunks to a file through a single large buffered handle"""
+    with open(
+        filename, "w", encoding="utf-8", newline="\n", buffering=XML_WRITE_BUFFER_SIZE
+    ) as f:
+        f.writelines(chunks)
 
 
 def create_google_earth_url(all_points):
     """Create a Google Earth Web URL with camera positioned to show the entire route"""
     # Calculate center point and bounding box
-    all_lats = [pt["coords"][0] for pt in all_points]
-    all_lons = [pt["coords"][1] for pt in all_points]
-    center_lat = (min(all_lats) + max(all_lats)) / 2
-    center_lon = (min(all_lons) + max(all_lons)) / 2
+    min_lat, max_lat = float(all_points.lats.min()), float(all_points.lats.max())
+    min_lon, max_lon = float(all_points.lons.min()), float(all_points.lons.max())
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2
 
     # Calculate the extent of the route
-    lat_range = max(all_lats) - min(all_lats)
-    lon_range = max(all_lons) - min(all_lons)
+    lat_range = max_lat - min_lat
+    lon_range = max_lon - min_lon
 
     # Calculate altitude (camera distance) based on route extent
     # This is an approximation - adjust multiplier as needed
@@ -742,15 +1176,18 @@ def save_markdown_itinerary(
     sleep_stops,
     walking_speed,
     all_points,
+    include_image=True,
 ):
     """Save the itinerary as a markdown file"""
     md_content = []
     md_content.append(f"# Hiking Itinerary\n")
-    md_content.append(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
+    md_content.append(
+        f"**Generated:** {datetime.now().strftime(DISPLAY_TIME_FORMAT)}\n"
+    )
     md_content.append(f"## Overview\n")
     md_content.append(f"- **Total Distance:** {total_distance:.2f} km")
-    md_content.append(f"- **Start:** {start_time.strftime('%Y-%m-%d %H:%M')}")
-    md_content.append(f"- **End:** {end_time.strftime('%Y-%m-%d %H:%M')}")
+    md_content.append(f"- **Start:** {start_time.strftime(DISPLAY_TIME_FORMAT)}")
+    md_content.append(f"- **End:** {end_time.strftime(DISPLAY_TIME_FORMAT)}")
     md_content.append(f"- **Walking Speed:** {walking_speed} km/h")
     md_content.append(
         f"- **Total Days:** {(end_time.date() - start_time.date()).days + 1}"
@@ -759,93 +1196,49 @@ def save_markdown_itinerary(
 
     md_content.append(f"## Daily Schedule\n")
 
-    # Calculate total days
-    total_days = len(sleep_stops) + 1 if sleep_stops else 1
-
-    # Day 1
-    md_content.append(f"### Day 1 - {start_time.strftime('%A, %B %d, %Y')}")
-    md_content.append(f"- **Start:** {start_time.strftime('%H:%M')}")
-    if sleep_stops:
-        day1_distance = sleep_stops[0]["point"]["cumulative_distance"]
-        day1_hours = day1_distance / walking_speed
-        md_content.append(f"- **Distance:** {day1_distance:.2f} km")
-        md_content.append(
-            f"- **Walking Time:** {day1_hours:.1f} hours ({int(day1_hours * 60)} minutes)"
-        )
-        md_content.append(
-            f"- **End:** Overnight at [{sleep_stops[0]['point']['coords'][0]:.6f}, {sleep_stops[0]['point']['coords'][1]:.6f}]({format_map_link(sleep_stops[0]['point']['coords'][0], sleep_stops[0]['point']['coords'][1])})\n"
-        )
-    else:
-        md_content.append(f"- **Distance:** {total_distance:.2f} km")
-        md_content.append(
-            f"- **Walking Time:** {total_distance/walking_speed:.1f} hours"
-        )
-        md_content.append(f"- **End:** {end_time.strftime('%H:%M')}\n")
+    day_distances = calculate_day_distances(
+        all_points.cumulative_distance, sleep_stops, total_distance
+    )
+    day_start_times = calculate_day_start_times(
+        start_time, end_time, day_distances, walking_speed
+    )
+    total_days = len(day_distances)
 
-    # Middle days
-    for i in range(len(sleep_stops)):
-        if i == 0:
-            continue  # Skip first night as it's covered in Day 1
+    # Coordinates and map link of each overnight stop, used in both sections
+    stop_coords = [all_points.coords(stop["index"]) for stop in sleep_stops]
+    stop_links = [format_map_link(lat, lon) for lat, lon in stop_coords]
 
-        day_num = i + 1
+    for day_num, (day_distance, day_start_time) in enumerate(
+        zip(day_distances, day_start_times), start=1
+    ):
         day_date = start_time + timedelta(days=day_num - 1)
-
-        # Determine start time for this day
-        if day_num < total_days:
-            # Middle days always start at 9:00
-            day_start_time = day_date.replace(hour=DEFAULT_START_HOUR, minute=0)
-        else:
-            # Last day - calculate start time based on end time and remaining distance
-            remaining_distance = (
-                total_distance - sleep_stops[i - 1]["point"]["cumulative_distance"]
-            )
-            hours_needed = remaining_distance / walking_speed
-            day_start_time = end_time - timedelta(hours=hours_needed)
+        day_hours = day_distance / walking_speed
 
         md_content.append(f"### Day {day_num} - {day_date.strftime('%A, %B %d, %Y')}")
         md_content.append(f"- **Start:** {day_start_time.strftime('%H:%M')}")
-
-        prev_distance = sleep_stops[i - 1]["point"]["cumulative_distance"]
-        day_distance = sleep_stops[i]["point"]["cumulative_distance"] - prev_distance
-        day_hours = day_distance / walking_speed
-
         md_content.append(f"- **Distance:** {day_distance:.2f} km")
-        md_content.append(
-            f"- **Walking Time:** {day_hours:.1f} hours ({int(day_hours * 60)} minutes)"
-        )
-        md_content.append(
-            f"- **End:** Overnight at [{sleep_stops[i]['point']['coords'][0]:.6f}, {sleep_stops[i]['point']['coords'][1]:.6f}]({format_map_link(sleep_stops[i]['point']['coords'][0], sleep_stops[i]['point']['coords'][1])})\n"
-        )
+        if sleep_stops:
+            md_content.append(
+                f"- **Walking Time:** {day_hours:.1f} hours ({int(day_hours * 60)} minutes)"
+            )
+        else:
+            md_content.append(f"- **Walking Time:** {day_hours:.1f} hours")
 
-    # Last day (if there are sleep stops)
-    if sleep_stops:
-        last_day = len(sleep_stops) + 1
-        last_date = start_time + timedelta(days=last_day - 1)
-
-        # Calculate start time for last day based on end time
-        last_distance = total_distance - sleep_stops[-1]["point"]["cumulative_distance"]
-        last_hours = last_distance / walking_speed
-        last_day_start = end_time - timedelta(hours=last_hours)
-
-        md_content.append(f"### Day {last_day} - {last_date.strftime('%A, %B %d, %Y')}")
-        md_content.append(f"- **Start:** {last_day_start.strftime('%H:%M')}")
-        md_content.append(f"- **Distance:** {last_distance:.2f} km")
-        md_content.append(
-            f"- **Walking Time:** {last_hours:.1f} hours ({int(last_hours * 60)} minutes)"
-        )
-        md_content.append(f"- **End:** {end_time.strftime('%H:%M')} - Finish!\n")
+        if day_num < total_days:
+            lat, lon = stop_coords[day_num - 1]
+            md_content.append(
+                f"- **End:** Overnight at [{lat:.6f}, {lon:.6f}]({stop_links[day_num - 1]})\n"
+            )
+        elif sleep_stops:
+            md_content.append(f"- **End:** {end_time.strftime('%H:%M')} - Finish!\n")
+        else:
+            md_content.append(f"- **End:** {end_time.strftime('%H:%M')}\n")
 
     md_content.append(f"## Map Links\n")
-    md_content.append(
-        f"- [Start Point]({format_map_link(all_points[0]['coords'][0], all_points[0]['coords'][1])})"
-    )
-    for i, stop in enumerate(sleep_stops):
-        md_content.append(
-            f"- [Night {i+1} Camp]({format_map_link(stop['point']['coords'][0], stop['point']['coords'][1])})"
-        )
-    md_content.append(
-        f"- [End Point]({format_map_link(all_points[-1]['coords'][0], all_points[-1]['coords'][1])})"
-    )
+    md_content.append(f"- [Start Point]({format_map_link(*all_points.coords(0))})")
+    for i, stop_link in enumerate(stop_links):
+        md_content.append(f"- [Night {i+1} Camp]({stop_link})")
+    md_content.append(f"- [End Point]({format_map_link(*all_points.coords(-1))})")
     md_content.append(
         f"- [Entire route on Google Maps]({format_route_link(all_points, sleep_stops)})"
     )
@@ -870,9 +1263,10 @@ def save_markdown_itinerary(
         f"- **Mobile**: Import the `.kml` file through the Google Earth mobile app"
     )
 
-    # Add image if it exists
-    image_filename = os.path.splitext(filename)[0] + ".png"
-    md_content.append(f"![Route map]({os.path.basename(image_filename)})\n")
+    # Link the route image when one is written next to the markdown file
+    if include_image:
+        image_filename = os.path.splitext(filename)[0] + ".png"
+        md_content.append(f"![Route map]({os.path.basename(image_filename)})\n")
 
     # Write to file
     with open(filename, "w", encoding="utf-8") as f:
@@ -883,8 +1277,6 @@ def save_markdown_itinerary(
 
 def calculate_heading(lat1, lon1, lat2, lon2):
     """Calculate bearing between two points"""
-    import math
-
     dlon = math.radians(lon2 - lon1)
     lat1_rad = math.radians(lat1)
     lat2_rad = math.radians(lat2)
@@ -899,270 +1291,233 @@ def calculate_heading(lat1, lon1, lat2, lon2):
 
 
 def sample_path_points(all_points, interval_km=2.5):
-    """Sample points along the path at regular intervals"""
-    sampled = [all_points[0]]  # Always include start
+    """Sample point indices along the path at regular intervals"""
+    cumulative_distance = all_points.cumulative_distance
+    last_index = len(all_points) - 1
+    sampled = [0]  # Always include start
     last_sampled_distance = 0
 
-    for point in all_points[1:]:
-        distance_from_last = point["cumulative_distance"] - last_sampled_distance
+    for i in range(1, last_index + 1):
+        distance_from_last = cumulative_distance[i] - last_sampled_distance
 
         if distance_from_last >= interval_km:
-            sampled.append(point)
-            last_sampled_distance = point["cumulative_distance"]
+            sampled.append(i)
+            last_sampled_distance = cumulative_distance[i]
 
     # Always include end point if not already included
-    if sampled[-1] != all_points[-1]:
-        sampled.append(all_points[-1])
+    if sampled[-1] != last_index:
+        sampled.append(last_index)
 
     return sampled
 
 
 def save_kml_file(filename, all_points, sleep_stops, route_name, start_time, end_time):
     """Save the route as a KML file with flythrough tour"""
-    kml_content = []
-    kml_content.append('<?xml version="1.0" encoding="UTF-8"?>')
-    kml_content.append(
-        '<kml xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2">'
-    )
-    kml_content.append("  <Document>")
-    kml_content.append(f"    <name>{route_name}</name>")
-    kml_content.append(
-        f'    <description>Hiking route from {start_time.strftime("%Y-%m-%d")} to {end_time.strftime("%Y-%m-%d")}</description>'
-    )
+    name = escape(route_name)
+
+    # Write each line to the file as it is produced
+    with open(
+        filename, "w", encoding="utf-8", newline="\n", buffering=XML_WRITE_BUFFER_SIZE
+    ) as f:
+
+        def write_line(line):
+            f.write(line)
+            f.write("\n")
+
+        write_line(
+            KML_DOCUMENT_HEADER.format(
+                name=name,
+                start=start_time.strftime("%Y-%m-%d"),
+                end=end_time.strftime("%Y-%m-%d"),
+            )
+        )
 
-    # Add styles
-    kml_content.append('    <Style id="routeStyle">')
-    kml_content.append("      <LineStyle>")
-    kml_content.append("        <color>ff0000ff</color>")  # Red line
-    kml_content.append("        <width>3</width>")
-    kml_content.append("      </LineStyle>")
-    kml_content.append("    </Style>")
-
-    kml_content.append('    <Style id="startStyle">')
-    kml_content.append("      <IconStyle>")
-    kml_content.append("        <color>ff00ff00</color>")  # Green
-    kml_content.append("        <scale>1.2</scale>")
-    kml_content.append("      </IconStyle>")
-    kml_content.append("    </Style>")
-
-    kml_content.append('    <Style id="sleepStyle">')
-    kml_content.append("      <IconStyle>")
-    kml_content.append("        <color>ff0000ff</color>")  # Red
-    kml_content.append("        <scale>1.1</scale>")
-    kml_content.append("      </IconStyle>")
-    kml_content.append("    </Style>")
-
-    kml_content.append('    <Style id="endStyle">')
-    kml_content.append("      <IconStyle>")
-    kml_content.append("        <color>ffff0000</color>")  # Blue
-    kml_content.append("        <scale>1.2</scale>")
-    kml_content.append("      </IconStyle>")
-    kml_content.append("    </Style>")
-
-    # Sample points along the path for smooth flythrough
-    # Use 2.5km intervals for ~40 waypoints on a 100km route
-    sampled_points = sample_path_points(all_points, interval_km=2.5)
-
-    # Add sleep stops to sampled points at appropriate positions
-    tour_waypoints = []
-    sleep_stop_indices = []
-
-    # Build tour waypoints list with proper ordering
-    current_sleep_idx = 0
-
-    for i, point in enumerate(sampled_points):
-        # Check if we should insert a sleep stop before this point
-        while current_sleep_idx < len(sleep_stops):
-            sleep_point = sleep_stops[current_sleep_idx]["point"]
-            if sleep_point["cumulative_distance"] <= point["cumulative_distance"]:
-                # Add sleep stop if it's not already in the list
-                if not tour_waypoints or tour_waypoints[-1]["point"] != sleep_point:
-                    tour_waypoints.append(
-                        {
-                            "point": sleep_point,
-                            "type": "sleep",
-                            "night": sleep_stops[current_sleep_idx]["night"],
-                        }
-                    )
-                    sleep_stop_indices.append(len(tour_waypoints) - 1)
-                current_sleep_idx += 1
+        # Add styles
+        write_line(KML_STYLES)
+
+        # Sample points along the path for smooth flythrough
+        # Use 2.5km intervals for ~40 waypoints on a 100km route
+        sampled_points = sample_path_points(all_points, interval_km=2.5)
+        cumulative_distance = all_points.cumulative_distance
+
+        # Add sleep stops to sampled points at appropriate positions
+        tour_waypoints = []
+        sleep_stop_indices = []
+
+        # Build tour waypoints list with proper ordering
+        current_sleep_idx = 0
+
+        for i, point_index in enumerate(sampled_points):
+            # Check if we should insert a sleep stop before this point
+            while current_sleep_idx < len(sleep_stops):
+                sleep_index = sleep_stops[current_sleep_idx]["index"]
+                if cumulative_distance[sleep_index] <= cumulative_distance[point_index]:
+                    # Add sleep stop if it's not already in the list
+                    if not tour_waypoints or tour_waypoints[-1]["index"] != sleep_index:
+                        tour_waypoints.append(
+                            {
+                                "index": sleep_index,
+                                "type": "sleep",
+                                "night": sleep_stops[current_sleep_idx]["night"],
+                            }
+                        )
+                        sleep_stop_indices.append(len(tour_waypoints) - 1)
+                    current_sleep_idx += 1
+                else:
+                    break
+
+            # Add the regular waypoint
+            waypoint_type = (
+                "start"
+                if i == 0
+                else ("end" if i == len(sampled_points) - 1 else "waypoint")
+            )
+            tour_waypoints.append({"index": point_index, "type": waypoint_type})
+
+        # Add tour for flythrough
+        write_line(KML_TOUR_HEADER)
+
+        # Create FlyTo elements for each waypoint
+        for i, waypoint in enumerate(tour_waypoints):
+            point_index = waypoint["index"]
+            lat, lon = all_points.coords(point_index)
+
+            # Calculate heading to look forward along the path
+            if i < len(tour_waypoints) - 1:
+                next_index = tour_waypoints[i + 1]["index"]
+                heading = calculate_heading(lat, lon, *all_points.coords(next_index))
+                # Offset by 90 degrees to look perpendicular to the path
+                heading = (heading - 90) % 360
             else:
-                break
+                heading = 0
 
-        # Add the regular waypoint
-        waypoint_type = (
-            "start"
-            if i == 0
-            else ("end" if i == len(sampled_points) - 1 else "waypoint")
-        )
-        tour_waypoints.append({"point": point, "type": waypoint_type})
+            # Determine duration based on distance to next waypoint
+            if i < len(tour_waypoints) - 1:
+                distance_to_next = abs(
+                    cumulative_distance[tour_waypoints[i + 1]["index"]]
+                    - cumulative_distance[point_index]
+                )
+                # 2-3 seconds per kilometer
+                duration = min(max(2.0, distance_to_next * 2.5), 8.0)
+            else:
+                duration = 5.0
+
+            # Special handling for different waypoint types
+            if waypoint["type"] == "start":
+                duration = 6.0
+                range_val = 1000
+                tilt = 65
+            elif waypoint["type"] == "end":
+                duration = 5.0
+                range_val = 1000
+                tilt = 65
+            elif waypoint["type"] == "sleep":
+                duration = 4.0
+                range_val = 800
+                tilt = 70
+            else:
+                range_val = 600 + (i % 3) * 100  # Vary between 600-800m
+                tilt = 60 + (i % 4) * 3  # Vary between 60-69 degrees
+
+            write_line(
+                KML_FLY_TO.format(
+                    duration=duration,
+                    lon=lon,
+                    lat=lat,
+                    range=range_val,
+                    tilt=tilt,
+                    heading=heading,
+                )
+            )
 
-    # Add tour for flythrough
-    kml_content.append("    <gx:Tour>")
-    kml_content.append("      <name>Hike Flythrough</name>")
-    kml_content.append(
-        "      <description>Automated tour following hiking path</description>"
-    )
-    kml_content.append("      <gx:Playlist>")
-
-    # Create FlyTo elements for each waypoint
-    for i, waypoint in enumerate(tour_waypoints):
-        point = waypoint["point"]
-        lat, lon = point["coords"]
-
-        # Calculate heading to look forward along the path
-        if i < len(tour_waypoints) - 1:
-            next_point = tour_waypoints[i + 1]["point"]
-            heading = calculate_heading(
-                lat, lon, next_point["coords"][0], next_point["coords"][1]
+            # Add pause at special points
+            if waypoint["type"] in ["start", "sleep", "end"]:
+                pause_duration = 3.0 if waypoint["type"] == "sleep" else 2.0
+                write_line(KML_WAIT.format(duration=pause_duration))
+
+        # Add final overview shot
+        min_lat, max_lat = float(all_points.lats.min()), float(all_points.lats.max())
+        min_lon, max_lon = float(all_points.lons.min()), float(all_points.lons.max())
+        center_lat = (min_lat + max_lat) / 2
+        center_lon = (min_lon + max_lon) / 2
+
+        # Calculate range based on route extent
+        lat_range = max_lat - min_lat
+        lon_range = max_lon - min_lon
+        overview_range = (
+            max(lat_range, lon_range) * 111000 * 1.5
+        )  # Convert to meters and add margin
+        overview_range = max(overview_range, 5000)  # Minimum 5km range
+
+        write_line(
+            KML_FLY_TO.format(
+                duration=8.0,
+                lon=center_lon,
+                lat=center_lat,
+                range=overview_range,
+                tilt=0,
+                heading=0,
             )
-            # Offset by 90 degrees to look perpendicular to the path
-            heading = (heading - 90) % 360
-        else:
-            heading = 0
+        )
+
+        write_line(KML_TOUR_FOOTER)
 
-        # Determine duration based on distance to next waypoint
-        if i < len(tour_waypoints) - 1:
-            distance_to_next = abs(
-                tour_waypoints[i + 1]["point"]["cumulative_distance"]
-                - point["cumulative_distance"]
+        # Add route line
+        write_line(KML_TRACK_HEADER.format(name=name))
+
+        # Add the track points in blocks of lines; KML uses lon,lat,elevation format
+        for block_start in range(0, len(all_points), KML_COORDINATE_BLOCK_SIZE):
+            block = slice(block_start, block_start + KML_COORDINATE_BLOCK_SIZE)
+            write_line(
+                "\n".join(
+                    map(
+                        "          {},{},0".format,
+                        all_points.lons[block].tolist(),
+                        all_points.lats[block].tolist(),
+                    )
+                )
             )
-            # 2-3 seconds per kilometer
-            duration = min(max(2.0, distance_to_next * 2.5), 8.0)
-        else:
-            duration = 5.0
-
-        # Special handling for different waypoint types
-        if waypoint["type"] == "start":
-            duration = 6.0
-            range_val = 1000
-            tilt = 65
-        elif waypoint["type"] == "end":
-            duration = 5.0
-            range_val = 1000
-            tilt = 65
-        elif waypoint["type"] == "sleep":
-            duration = 4.0
-            range_val = 800
-            tilt = 70
-        else:
-            range_val = 600 + (i % 3) * 100  # Vary between 600-800m
-            tilt = 60 + (i % 4) * 3  # Vary between 60-69 degrees
-
-        kml_content.append("        <gx:FlyTo>")
-        kml_content.append(f"          <gx:duration>{duration:.1f}</gx:duration>")
-        kml_content.append("          <gx:flyToMode>smooth</gx:flyToMode>")
-        kml_content.append("          <LookAt>")
-        kml_content.append(f"            <longitude>{lon}</longitude>")
-        kml_content.append(f"            <latitude>{lat}</latitude>")
-        kml_content.append("            <altitude>0</altitude>")
-        kml_content.append(f"            <range>{range_val}</range>")
-        kml_content.append(f"            <tilt>{tilt}</tilt>")
-        kml_content.append(f"            <heading>{heading:.0f}</heading>")
-        kml_content.append("          </LookAt>")
-        kml_content.append("        </gx:FlyTo>")
-
-        # Add pause at special points
-        if waypoint["type"] in ["start", "sleep", "end"]:
-            pause_duration = 3.0 if waypoint["type"] == "sleep" else 2.0
-            kml_content.append("        <gx:Wait>")
-            kml_content.append(f"          <gx:duration>{pause_duration}</gx:duration>")
-            kml_content.append("        </gx:Wait>")
-
-    # Add final overview shot
-    all_lats = [pt["coords"][0] for pt in all_points]
-    all_lons = [pt["coords"][1] for pt in all_points]
-    center_lat = (min(all_lats) + max(all_lats)) / 2
-    center_lon = (min(all_lons) + max(all_lons)) / 2
-
-    # Calculate range based on route extent
-    lat_range = max(all_lats) - min(all_lats)
-    lon_range = max(all_lons) - min(all_lons)
-    overview_range = (
-        max(lat_range, lon_range) * 111000 * 1.5
-    )  # Convert to meters and add margin
-    overview_range = max(overview_range, 5000)  # Minimum 5km range
-
-    kml_content.append("        <gx:FlyTo>")
-    kml_content.append("          <gx:duration>8.0</gx:duration>")
-    kml_content.append("          <gx:flyToMode>smooth</gx:flyToMode>")
-    kml_content.append("          <LookAt>")
-    kml_content.append(f"            <longitude>{center_lon}</longitude>")
-    kml_content.append(f"            <latitude>{center_lat}</latitude>")
-    kml_content.append("            <altitude>0</altitude>")
-    kml_content.append(f"            <range>{overview_range:.0f}</range>")
-    kml_content.append("            <tilt>0</tilt>")
-    kml_content.append("            <heading>0</heading>")
-    kml_content.append("          </LookAt>")
-    kml_content.append("        </gx:FlyTo>")
-
-    kml_content.append("      </gx:Playlist>")
-    kml_content.append("    </gx:Tour>")
-
-    # Add route line
-    kml_content.append("    <Placemark>")
-    kml_content.append(f"      <name>{route_name} - Track</name>")
-    kml_content.append("      <styleUrl>#routeStyle</styleUrl>")
-    kml_content.append("      <LineString>")
-    kml_content.append("        <tessellate>1</tessellate>")
-    kml_content.append("        <coordinates>")
-
-    # Add all track points
-    for point in all_points:
-        lat, lon = point["coords"]
-        # KML uses lon,lat,elevation format
-        kml_content.append(f"          {lon},{lat},0")
-
-    kml_content.append("        </coordinates>")
-    kml_content.append("      </LineString>")
-    kml_content.append("    </Placemark>")
-
-    # Add start point
-    start_lat, start_lon = all_points[0]["coords"]
-    kml_content.append("    <Placemark>")
-    kml_content.append("      <name>Start</name>")
-    kml_content.append(
-        f'      <description>Start of hike: {start_time.strftime("%Y-%m-%d %H:%M")}</description>'
-    )
-    kml_content.append("      <styleUrl>#startStyle</styleUrl>")
-    kml_content.append("      <Point>")
-    kml_content.append(f"        <coordinates>{start_lon},{start_lat},0</coordinates>")
-    kml_content.append("      </Point>")
-    kml_content.append("    </Placemark>")
 
-    # Add sleep stops
-    for i, stop in enumerate(sleep_stops):
-        lat, lon = stop["point"]["coords"]
-        kml_content.append("    <Placemark>")
-        kml_content.append(f"      <name>Night {i+1} Camp</name>")
-        kml_content.append(
-            f'      <description>Overnight stop {i+1}<br/>Distance: {stop["point"]["cumulative_distance"]:.2f} km</description>'
+        write_line(KML_TRACK_FOOTER)
+
+        # Add start point
+        start_lat, start_lon = all_points.coords(0)
+        write_line(
+            KML_PLACEMARK.format(
+                name="Start",
+                description=f"Start of hike: {start_time.strftime(DISPLAY_TIME_FORMAT)}",
+                style="startStyle",
+                lon=start_lon,
+                lat=start_lat,
+            )
         )
-        kml_content.append("      <styleUrl>#sleepStyle</styleUrl>")
-        kml_content.append("      <Point>")
-        kml_content.append(f"        <coordinates>{lon},{lat},0</coordinates>")
-        kml_content.append("      </Point>")
-        kml_content.append("    </Placemark>")
-
-    # Add end point
-    end_lat, end_lon = all_points[-1]["coords"]
-    kml_content.append("    <Placemark>")
-    kml_content.append("      <name>Finish</name>")
-    kml_content.append(
-        f'      <description>End of hike: {end_time.strftime("%Y-%m-%d %H:%M")}</description>'
-    )
-    kml_content.append("      <styleUrl>#endStyle</styleUrl>")
-    kml_content.append("      <Point>")
-    kml_content.append(f"        <coordinates>{end_lon},{end_lat},0</coordinates>")
-    kml_content.append("      </Point>")
-    kml_content.append("    </Placemark>")
 
-    kml_content.append("  </Document>")
-    kml_content.append("</kml>")
+        # Add sleep stops
+        for i, stop in enumerate(sleep_stops):
+            lat, lon = all_points.coords(stop["index"])
+            write_line(
+                KML_PLACEMARK.format(
+                    name=f"Night {i+1} Camp",
+                    description=f"Overnight stop {i+1}<br/>Distance: {cumulative_distance[stop['index']]:.2f} km",
+                    style="sleepStyle",
+                    lon=lon,
+                    lat=lat,
+                )
+            )
+
+        # Add end point
+        end_lat, end_lon = all_points.coords(-1)
+        write_line(
+            KML_PLACEMARK.format(
+                name="Finish",
+                description=f"End of hike: {end_time.strftime(DISPLAY_TIME_FORMAT)}",
+                style="endStyle",
+                lon=end_lon,
+                lat=end_lat,
+            )
+        )
 
-    # Write to file
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write("\n".join(kml_content))
+        write_line(KML_DOCUMENT_FOOTER)
 
     # Calculate and display tour statistics
     num_waypoints = len(tour_waypoints)
@@ -1172,90 +1527,74 @@ def save_kml_file(filename, all_points, sleep_stops, route_name, start_time, end
     print(f"  - Duration varies based on distance between waypoints")
 
 
-# Also add the import for math at the top of your script if not already present
-import math
-
-
 def validate_gpx_data(all_points, sleep_stops, total_distance):
-    """Validate GPX data and return list of warnings"""
-    warnings = []
-
+    """Validate GPX data and yield warnings, cheapest checks first"""
     # Check if route has reasonable number of points
     if len(all_points) < 2:
-        warnings.append("Route has very few points (less than 2)")
+        yield "Route has very few points (less than 2)"
 
-    # Check for reasonable daily distances
+    # Check for unreasonably long (over 40km) or short daily distances
     if sleep_stops:
-        daily_distances = []
-        prev_distance = 0
-
-        for stop in sleep_stops:
-            daily_distance = stop["point"]["cumulative_distance"] - prev_distance
-            daily_distances.append(daily_distance)
-            prev_distance = stop["point"]["cumulative_distance"]
-
-        # Add final day distance
-        final_distance = total_distance - prev_distance
-        daily_distances.append(final_distance)
-
-        # Check for unreasonably long daily distances (over 40km)
+        daily_distances = calculate_day_distances(
+            all_points.cumulative_distance, sleep_stops, total_distance
+        )
         for i, distance in enumerate(daily_distances):
             if distance > 40:
-                warnings.append(f"Day {i+1} distance is very long: {distance:.1f} km")
+                yield f"Day {i+1} distance is very long: {distance:.1f} km"
             elif distance < 1:
-                warnings.append(f"Day {i+1} distance is very short: {distance:.1f} km")
+                yield f"Day {i+1} distance is very short: {distance:.1f} km"
 
     # Check total distance reasonableness
     if total_distance > 500:
-        warnings.append(f"Total distance is very long: {total_distance:.1f} km")
+        yield f"Total distance is very long: {total_distance:.1f} km"
     elif total_distance < 1:
-        warnings.append(f"Total distance is very short: {total_distance:.1f} km")
+        yield f"Total distance is very short: {total_distance:.1f} km"
 
     # Check for duplicate coordinates (might indicate GPS errors)
-    coord_counts = {}
-    for point in all_points:
-        coord_key = f"{point['coords'][0]:.6f},{point['coords'][1]:.6f}"
-        coord_counts[coord_key] = coord_counts.get(coord_key, 0) + 1
+    # Coordinates are compared at 6 decimal places (about 0.1 m), packed into
+    # one int64 key per point; the key is unique while |lon| < 2147 degrees
+    lat_keys = np.rint(all_points.lats * 1e6).astype(np.int64)
+    lon_keys = np.rint(all_points.lons * 1e6).astype(np.int64)
+    _, coord_counts = np.unique((lat_keys << 32) + lon_keys, return_counts=True)
 
-    duplicate_coords = sum(1 for count in coord_counts.values() if count > 1)
+    duplicate_coords = int(np.count_nonzero(coord_counts > 1))
     if duplicate_coords > len(all_points) * 0.1:  # More than 10% duplicates
-        warnings.append(
-            f"High number of duplicate coordinates detected: {duplicate_coords}"
-        )
-
-    return warnings
+        yield f"High number of duplicate coordinates detected: {duplicate_coords}"
 
 
 def save_route_image(filename, all_points, sleep_stops, route_name):
     """Save a PNG image of the route using matplotlib with built-in compression"""
-    import matplotlib.pyplot as plt
-    import os
+    from matplotlib.figure import Figure
 
-    lats = [pt["coords"][0] for pt in all_points]
-    lons = [pt["coords"][1] for pt in all_points]
+    lats = all_points.lats
+    lons = all_points.lons
 
-    plt.figure(figsize=(8, 6))
-    plt.plot(lons, lats, color="blue", linewidth=2, label="Route")
+    # Draw on a standalone Figure rather than through pyplot, which avoids
+    # setting up a GUI backend and figure manager just to save a PNG
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    ax.plot(lons, lats, color="blue", linewidth=2, label="Route")
 
     # Mark start and end
-    plt.scatter(lons[0], lats[0], color="green", s=80, label="Start", zorder=5)
-    plt.scatter(lons[-1], lats[-1], color="red", s=80, label="End", zorder=5)
+    ax.scatter(lons[0], lats[0], color="green", s=80, label="Start", zorder=5)
+    ax.scatter(lons[-1], lats[-1], color="red", s=80, label="End", zorder=5)
 
     # Mark sleep stops
     if sleep_stops:
-        sleep_lats = [stop["point"]["coords"][0] for stop in sleep_stops]
-        sleep_lons = [stop["point"]["coords"][1] for stop in sleep_stops]
-        plt.scatter(sleep_lons, sleep_lats, s=60, label="Overnight", zorder=5)
-
-    plt.title(route_name)
-    plt.xlabel("Longitude")
-    plt.ylabel("Latitude")
-    plt.legend()
-    plt.grid(True, linestyle="--", alpha=0.5)
-    plt.tight_layout()
+        sleep_indices = [stop["index"] for stop in sleep_stops]
+        sleep_lats = lats[sleep_indices]
+        sleep_lons = lons[sleep_indices]
+        ax.scatter(sleep_lons, sleep_lats, s=60, label="Overnight", zorder=5)
+
+    ax.set_title(route_name)
+    ax.set_xlabel("Longitude")
+    ax.set_ylabel("Latitude")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.5)
+    fig.tight_layout()
 
     # Save with maximum compression using matplotlib's built-in options
-    plt.savefig(
+    fig.savefig(
         filename,
         dpi=100,
         pil_kwargs={
@@ -1263,52 +1602,66 @@ def save_route_image(filename, all_points, sleep_stops, route_name):
             "optimize": True,  # Additional optimization pass
         },
     )
-    plt.close()
 
     file_size = os.path.getsize(filename) / 1024  # Size in KB
     print(f"PNG image saved as '{filename}' ({file_size:.1f} KB, compressed)")
 
 
 def main():
+    global np
+
+    args = sys.argv[1:]
+
+    # Installing missing packages with pip is opt-in
+    bootstrap = pop_flag(args, "--bootstrap")
+
+    # Use WGS84 geodesic distances instead of the haversine approximation
+    geodesic = pop_flag(args, "--geodesic")
+
+    # Skip drawing the PNG route image, and with it the matplotlib import
+    no_png = pop_flag(args, "--no-png")
+
+    if not args or args[0] in ("-h", "--help"):
+        print_help()
+        sys.exit(0)
+
+    # Check dependencies before proceeding when requested
+    if bootstrap:
+        check_and_install_dependencies(need_matplotlib=not no_png)
+
+    if np is None:
+        try:
+            import numpy as np
+        except ImportError:
+            print(f"Error: numpy is required to run gpx-route-timer")
+            print(f"   pip install numpy (or run again with --bootstrap)")
+            sys.exit(1)
+
     # Support -e or -example for the example GPX
     example_url = (
         "https://github.com/pattespatte/gpx-route-timer/raw/main/misc/example.gpx"
     )
-    if len(sys.argv) > 1:
-        arg = sys.argv[1]
-        if arg in ("-h", "--help"):
-            print_help()
-            sys.exit(0)
-        elif arg in ("-e", "-example"):
-            source = example_url
-            print(f"\nUsing example GPX source: {source}")
-        else:
-            source = arg
-            print(f"\nUsing GPX source from command line: {source}")
+    if args[0] in ("-e", "-example"):
+        source = example_url
+        print(f"\nUsing example GPX source: {source}")
     else:
-        print(f"\nGPX source can be either a URL (http://...) or a local file path")
-        source = get_user_input("GPX source (URL or file path)", example_url)
+        source = args[0]
+        print(f"\nUsing GPX source from command line: {source}")
 
-    # Load GPX content
-    gpx_xml = load_gpx_content(source)
-
-    # Parse XML with proper namespace handling
+    # Load and parse the GPX content, detecting the GPX type
     try:
-        root = ET.fromstring(gpx_xml)
-    except ET.ParseError as e:
+        gpx_type, all_points, metadata_name = load_and_parse_gpx(source)
+    except GPX_PARSE_ERRORS as e:
         print(f"Error parsing GPX file: {e}")
         sys.exit(1)
 
-    # Detect GPX type and extract points accordingly
-    gpx_type, elements = detect_gpx_type(root)
-
     if gpx_type == "none":
         print(f"Error: No waypoints, tracks, or routes found in GPX file")
         sys.exit(1)
 
     # Handle different GPX types
     if gpx_type == "waypoint":
-        print(f"Found {len(elements)} waypoints in the GPX file.")
+        print(f"Found {len(all_points)} waypoints in the GPX file.")
         print(
             f"The input GPX does not contain a route or track, only individual waypoints."
         )
@@ -1321,7 +1674,6 @@ def main():
             print(f"Exiting without processing.")
             sys.exit(0)
 
-        all_points = extract_points_from_waypoints(elements)
         print(f"Converting {len(all_points)} waypoints to a planned route...")
 
     elif gpx_type == "track":
@@ -1330,12 +1682,10 @@ def main():
             f"The input contains a recorded path (track). It will be converted into a planned route."
         )
 
-        all_points = extract_points_from_tracks(elements)
         print(f"Converting {len(all_points)} track points to a planned route...")
 
     elif gpx_type == "route":
         print(f"Found route data in the GPX file.")
-        all_points = extract_points_from_routes(elements)
         print(f"Processing {len(all_points)} route points...")
 
     if not all_points:
@@ -1343,15 +1693,18 @@ def main():
         sys.exit(1)
 
     # Calculate cumulative distance with progress indicator
-    total_distance = calculate_cumulative_distances(all_points)
+    total_distance = calculate_cumulative_distances(all_points, geodesic)
 
     # After calculating total distance, add Komoot notice
     print(f"\nTotal distance: {total_distance:.2f} km")
 
     # ... existing code for detecting overnight stops ...
 
+    # One reference time for all date prompts, warnings and file names
+    now = datetime.now()
+
     # Add Komoot compatibility notice
-    suggested_date = datetime.now() + timedelta(days=7)
+    suggested_date = now + timedelta(days=7)
     suggested_date = suggested_date.replace(
         hour=DEFAULT_START_HOUR, minute=0, second=0, microsecond=0
     )
@@ -1364,22 +1717,12 @@ def main():
     existing_start_time = None
     existing_end_time = None
 
-    # Find first and last timestamps in the GPX
-    for pt in all_points[0]["element"].iter():
-        if pt.tag == "time" or pt.tag.endswith("}time"):
-            try:
-                existing_start_time = datetime.fromisoformat(pt.text.rstrip("Z"))
-                break
-            except:
-                pass
-
-    for pt in all_points[-1]["element"].iter():
-        if pt.tag == "time" or pt.tag.endswith("}time"):
-            try:
-                existing_end_time = datetime.fromisoformat(pt.text.rstrip("Z"))
-                break
-            except:
-                pass
+    # Find first and last timestamps in the GPX, NaT if missing or invalid
+    first_time, last_time = all_points.parsed_times[[0, -1]]
+    if not np.isnat(first_time):
+        existing_start_time = first_time.item()
+    if not np.isnat(last_time):
+        existing_end_time = last_time.item()
 
     # Handle start time
     if existing_start_time:
@@ -1390,27 +1733,15 @@ def main():
         start_time_input = input().strip()
 
         if start_time_input:
-            try:
-                start_time = datetime.fromisoformat(start_time_input)
-            except ValueError:
-                print(f"Invalid date format. Please use YYYY-MM-DDTHH:MM")
-                sys.exit(1)
+            start_time = parse_user_time(start_time_input)
         else:
             start_time = existing_start_time
     else:
         # No existing timestamp, use default
-        default_start_date = datetime.now() + timedelta(days=7)
-        default_start_date = default_start_date.replace(
-            hour=DEFAULT_START_HOUR, minute=0, second=0, microsecond=0
-        )
-        default_start = default_start_date.strftime("%Y-%m-%dT%H:%M")
+        default_start = suggested_date.strftime("%Y-%m-%dT%H:%M")
 
         start_time_str = get_user_input("Start time (YYYY-MM-DDTHH:MM)", default_start)
-        try:
-            start_time = datetime.fromisoformat(start_time_str)
-        except ValueError:
-            print("Invalid date format. Please use YYYY-MM-DDTHH:MM")
-            sys.exit(1)
+        start_time = parse_user_time(start_time_str)
 
     # Handle end time
     if existing_end_time:
@@ -1421,11 +1752,7 @@ def main():
         end_time_input = input().strip()
 
         if end_time_input:
-            try:
-                end_time = datetime.fromisoformat(end_time_input)
-            except ValueError:
-                print(f"Invalid date format. Please use YYYY-MM-DDTHH:MM")
-                sys.exit(1)
+            end_time = parse_user_time(end_time_input)
         else:
             end_time = existing_end_time
     else:
@@ -1437,14 +1764,10 @@ def main():
         default_end = default_end_date.strftime("%Y-%m-%dT%H:%M")
 
         end_time_str = get_user_input("End time (YYYY-MM-DDTHH:MM)", default_end)
-        try:
-            end_time = datetime.fromisoformat(end_time_str)
-        except ValueError:
-            print("Invalid date format. Please use YYYY-MM-DDTHH:MM")
-            sys.exit(1)
+        end_time = parse_user_time(end_time_str)
 
     # Add a friendly warning if dates are still too far ahead
-    days_ahead = (start_time - datetime.now()).days
+    days_ahead = (start_time - now).days
     if days_ahead > KOMOOT_MAX_DAYS_AHEAD:
         print(f"\n⚠️  Note: Start date is {days_ahead} days in the future.")
         print(
@@ -1475,32 +1798,14 @@ def main():
     existing_stop_indices = []
     if all_points and len(all_points) > 1:
         # Check if GPX has timestamps and look for gaps indicating overnight stops
-        timestamps = []
-        for i, point in enumerate(all_points):
-            time_elem = None
-            # Look for time element in the point
-            for elem in point["element"].iter():
-                if elem.tag == "time" or elem.tag.endswith("}time"):
-                    time_elem = elem
-                    break
-
-            if time_elem is not None and time_elem.text:
-                try:
-                    timestamp = datetime.fromisoformat(time_elem.text.rstrip("Z"))
-                    timestamps.append((i, timestamp))
-                except:
-                    pass
+        point_times = all_points.parsed_times
+        timed_indices = np.flatnonzero(~np.isnat(point_times))
+        time_gaps = np.diff(point_times[timed_indices])
 
-        # Look for gaps of more than OVERNIGHT_GAP_HOURS hours
-        if len(timestamps) > 1:
-            for i in range(1, len(timestamps)):
-                prev_idx, prev_time = timestamps[i - 1]
-                curr_idx, curr_time = timestamps[i]
-                time_gap = (curr_time - prev_time).total_seconds() / 3600
-
-                if time_gap >= OVERNIGHT_GAP_HOURS:
-                    # Found an overnight gap - mark the point before the gap as a stop
-                    existing_stop_indices.append(prev_idx)
+        # Look for gaps of more than OVERNIGHT_GAP_HOURS hours, marking the
+        # point before each gap as a stop
+        overnight = time_gaps >= np.timedelta64(OVERNIGHT_GAP_HOURS, "h")
+        existing_stop_indices = timed_indices[:-1][overnight].tolist()
 
     # Handle overnight stops - check for existing ones first
     user_kept_existing_stops = False
@@ -1515,14 +1820,14 @@ def main():
             sleep_stops.append(
                 {
                     "night": i + 1,
-                    "point": all_points[stop_idx],
-                    "target_distance": all_points[stop_idx]["cumulative_distance"],
+                    "index": stop_idx,
+                    "target_distance": all_points.cumulative_distance[stop_idx],
                 }
             )
 
         # Display detected overnight stops
         display_sleep_stops(
-            sleep_stops, total_distance, "Existing overnight locations:"
+            all_points, sleep_stops, total_distance, "Existing overnight locations:"
         )
 
         # Ask if user wants to keep or recalculate
@@ -1544,21 +1849,13 @@ def main():
                 print(f"Average daily distance: {daily_distance:.2f} km")
 
                 # Find sleep-over locations
-                sleep_stops = []
-                for night in range(1, num_nights + 1):
-                    target_distance = daily_distance * night
-                    closest_point = find_closest_point(all_points, target_distance)
-                    sleep_stops.append(
-                        {
-                            "night": night,
-                            "point": closest_point,
-                            "target_distance": target_distance,
-                        }
-                    )
+                sleep_stops = calculate_sleep_stops(
+                    all_points.cumulative_distance, daily_distance, num_nights
+                )
 
                 # Display the newly calculated sleep-over locations
                 display_sleep_stops(
-                    sleep_stops, total_distance, "New sleep-over locations:"
+                    all_points, sleep_stops, total_distance, "New sleep-over locations:"
                 )
         else:
             # User chose to keep existing stops
@@ -1576,21 +1873,16 @@ def main():
             print(f"Average daily distance: {daily_distance:.2f} km")
 
             # Find sleep-over locations
-            sleep_stops = []
-            for night in range(1, num_nights + 1):
-                target_distance = daily_distance * night
-                closest_point = find_closest_point(all_points, target_distance)
-                sleep_stops.append(
-                    {
-                        "night": night,
-                        "point": closest_point,
-                        "target_distance": target_distance,
-                    }
-                )
+            sleep_stops = calculate_sleep_stops(
+                all_points.cumulative_distance, daily_distance, num_nights
+            )
 
             # Display proposed sleep-over locations
             display_sleep_stops(
-                sleep_stops, total_distance, "Proposed sleep-over locations:"
+                all_points,
+                sleep_stops,
+                total_distance,
+                "Proposed sleep-over locations:",
             )
 
     # Allow user to adjust sleep-over locations (only for newly calculated stops)
@@ -1602,8 +1894,9 @@ def main():
 
         if adjust == "yes":
             for stop in sleep_stops:
+                current_lat, current_lon = all_points.coords(stop["index"])
                 print(
-                    f"\nNight {stop['night']} - Current: {stop['point']['coords'][0]:.6f}, {stop['point']['coords'][1]:.6f}"
+                    f"\nNight {stop['night']} - Current: {current_lat:.6f}, {current_lon:.6f}"
                 )
                 new_coords = input(
                     "Press ENTER to keep current coordinates or type new coordinates (lat,lon): "
@@ -1614,17 +1907,14 @@ def main():
                         lat, lon = parse_coordinates(new_coords)
 
                         # Find closest point to new coordinates
-                        min_dist = float("inf")
-                        closest_point = None
-                        for point in all_points:
-                            dist = safe_geodesic((lat, lon), point["coords"])
-                            if dist < min_dist:
-                                min_dist = dist
-                                closest_point = point
-
-                        stop["point"] = closest_point
+                        closest_index, min_dist = find_nearest_index(
+                            all_points, lat, lon
+                        )
+
+                        stop["index"] = closest_index
+                        closest_lat, closest_lon = all_points.coords(closest_index)
                         print(
-                            f"  Adjusted to nearest track point: {closest_point['coords'][0]:.6f}, {closest_point['coords'][1]:.6f}"
+                            f"  Adjusted to nearest track point: {closest_lat:.6f}, {closest_lon:.6f}"
                         )
                         print(f"  Distance from input: {min_dist*1000:.0f} meters")
                     except ValueError as e:
@@ -1636,18 +1926,19 @@ def main():
 
     # Extract route name from GPX metadata if available
     default_route_name = "Hiking Route"
-    metadata_name = root.find(f".//{{{GPX_NAMESPACE}}}metadata/{{{GPX_NAMESPACE}}}name")
-    if metadata_name is not None and metadata_name.text:
-        default_route_name = metadata_name.text.strip()
+    if metadata_name:
+        default_route_name = metadata_name
 
     # Get route name
     route_name = get_user_input("Route name", default_route_name)
 
     # Validate the route before saving
-    warnings = validate_gpx_data(all_points, sleep_stops, total_distance)
-    if warnings:
+    validation_warnings = validate_gpx_data(all_points, sleep_stops, total_distance)
+    first_warning = next(validation_warnings, None)
+    if first_warning is not None:
         print(f"\n⚠️  Route validation warnings:")
-        for warning in warnings:
+        print(f"   - {first_warning}")
+        for warning in validation_warnings:
             print(f"   - {warning}")
         proceed = input(f"\nDo you want to continue anyway? (yes/no): ").strip().lower()
         if proceed != "yes":
@@ -1656,18 +1947,15 @@ def main():
 
     # Create new GPX structure matching Komoot's format
     print(f"\nCreating GPX file...")
-    new_root = create_komoot_compatible_gpx(
+    gpx_content = create_komoot_compatible_gpx(
         all_points, sleep_stops, start_time, end_time, walking_speed, route_name
     )
 
-    # Pretty print the XML
-    indent_xml(new_root)
-
     # Generate output filename
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    timestamp = now.strftime("%Y%m%d-%H%M%S")
 
     # Extract base name from source
-    if urlparse(source).scheme:
+    if is_url(source):
         # It's a URL, use a generic name
         base_name = "gpx_route"
     else:
@@ -1677,9 +1965,11 @@ def main():
     default_output = f"{base_name}-{timestamp}.gpx"
     output_file = get_user_input("Output filename", default_output)
 
+    # The other output files share the GPX file name without its extension
+    output_stem = os.path.splitext(output_file)[0]
+
     # Save the modified GPX file
-    tree = ET.ElementTree(new_root)
-    tree.write(output_file, xml_declaration=True, encoding="UTF-8", method="xml")
+    write_gpx_file(output_file, gpx_content)
 
     print(f"\nGPX route file saved as '{output_file}'")
 
@@ -1696,9 +1986,6 @@ def main():
         )
 
         if split_days == "yes":
-            # Extract base filename without extension
-            base_filename = os.path.splitext(output_file)[0]
-
             print(f"\nCreating daily GPX files...")
             daily_files = create_daily_gpx_files(
                 all_points,
@@ -1707,7 +1994,7 @@ def main():
                 end_time,
                 walking_speed,
                 route_name,
-                base_filename,
+                output_stem,
             )
 
             print(f"\nCreated {len(daily_files)} daily GPX files:")
@@ -1726,41 +2013,31 @@ def main():
     # Show final summary with sleep stops
     if sleep_stops:
         print(f"\nFinal itinerary:")
-        print(f"Day 1: Start at {start_time.strftime('%Y-%m-%d %H:%M')}")
-        day1_dist = sleep_stops[0]["point"]["cumulative_distance"]
-        print(
-            f"  → Walk {day1_dist:.1f} km to overnight stop at {sleep_stops[0]['point']['coords'][0]:.6f}, {sleep_stops[0]['point']['coords'][1]:.6f}"
+        day_distances = calculate_day_distances(
+            all_points.cumulative_distance, sleep_stops, total_distance
         )
-
-        for i in range(len(sleep_stops)):
-            day_num = i + 2
-            if i < len(sleep_stops) - 1:
-                # Middle days start at 9:00
-                day_start = (start_time + timedelta(days=i + 1)).replace(
-                    hour=DEFAULT_START_HOUR, minute=0
+        day_start_times = calculate_day_start_times(
+            start_time, end_time, day_distances, walking_speed
+        )
+        for day_num, (day_distance, day_start_time) in enumerate(
+            zip(day_distances, day_start_times), start=1
+        ):
+            print(
+                f"Day {day_num}: Start at {day_start_time.strftime(DISPLAY_TIME_FORMAT)}"
+            )
+            if day_num <= len(sleep_stops):
+                stop_lat, stop_lon = all_points.coords(
+                    sleep_stops[day_num - 1]["index"]
                 )
-                print(f"Day {day_num}: Start at {day_start.strftime('%Y-%m-%d %H:%M')}")
-                prev_dist = sleep_stops[i]["point"]["cumulative_distance"]
-                next_dist = sleep_stops[i + 1]["point"]["cumulative_distance"]
-                day_dist = next_dist - prev_dist
                 print(
-                    f"  → Walk {day_dist:.1f} km to overnight stop at {sleep_stops[i+1]['point']['coords'][0]:.6f}, {sleep_stops[i+1]['point']['coords'][1]:.6f}"
+                    f"  → Walk {day_distance:.1f} km to overnight stop at {stop_lat:.6f}, {stop_lon:.6f}"
                 )
             else:
-                # Last day - calculate start time based on end time
-                last_dist = (
-                    total_distance - sleep_stops[i]["point"]["cumulative_distance"]
-                )
-                last_hours = last_dist / walking_speed
-                last_day_start = end_time - timedelta(hours=last_hours)
-                print(
-                    f"Day {day_num}: Start at {last_day_start.strftime('%Y-%m-%d %H:%M')}"
-                )
-                print(f"  → Walk {last_dist:.1f} km to finish")
-                print(f"\nArrive at {end_time.strftime('%Y-%m-%d %H:%M')}")
+                print(f"  → Walk {day_distance:.1f} km to finish")
+                print(f"\nArrive at {end_time.strftime(DISPLAY_TIME_FORMAT)}")
 
     # Save markdown itinerary
-    md_filename = os.path.splitext(output_file)[0] + ".md"
+    md_filename = output_stem + ".md"
     save_markdown_itinerary(
         md_filename,
         start_time,
@@ -1769,10 +2046,11 @@ def main():
         sleep_stops,
         walking_speed,
         all_points,
+        include_image=not no_png,
     )
 
     # Save KML file
-    kml_filename = os.path.splitext(output_file)[0] + ".kml"
+    kml_filename = output_stem + ".kml"
     save_kml_file(
         kml_filename,
         all_points,
@@ -1782,14 +2060,15 @@ def main():
         end_time,
     )
 
-    # Save PNG image
-    png_filename = os.path.splitext(output_file)[0] + ".png"
-    save_route_image(
-        png_filename,
-        all_points,
-        sleep_stops,
-        route_name,
-    )
+    # Save PNG image unless it was turned off
+    png_filename = output_stem + ".png"
+    if not no_png:
+        save_route_image(
+            png_filename,
+            all_points,
+            sleep_stops,
+            route_name,
+        )
 
     print(f"\nFiles created:")
     print(f"- GPX file: {output_file}")
@@ -1801,7 +2080,8 @@ def main():
 
     print(f"- Markdown itinerary: {md_filename}")
     print(f"- KML file: {kml_filename}")
-    print(f"- PNG image: {png_filename}")
+    if not no_png:
+        print(f"- PNG image: {png_filename}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+@pytest.fixture
+def route_gpx():
+    """Raw bytes of the small test route"""
+    with open(os.path.join(DATA_DIR, "route.gpx"), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the parsed points cache at a temporary directory"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delenv("GPX_ROUTE_TIMER_NO_CACHE", raising=False)
+    return tmp_path / "gpx-route-timer"
@@ -0,0 +1,182 @@
+import io
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import gpx_route_timer as grt
+from conftest import DATA_DIR
+
+START_TIME = datetime(2025, 6, 1, 9, 0)
+END_TIME = datetime(2025, 6, 2, 17, 0)
+
+# Creation time written to the golden GPX file in place of the current time
+GOLDEN_CREATED = "2025-05-01T12:00:00Z"
+
+
+@pytest.mark.parametrize(
+    "target, expected",
+    [
+        (0.4, 0),
+        (0.6, 1),  # first of the points sharing a distance
+        (1.5, 1),  # ties go to the earlier point
+        (2.5, 3),
+        (9.0, 4),  # beyond the end of the route
+    ],
+)
+def test_find_closest_indices(target, expected):
+    cumulative_distance = np.array([0.0, 1.0, 1.0, 2.0, 3.0])
+    indices = grt.find_closest_indices(cumulative_distance, np.array([target]))
+    assert indices.tolist() == [expected]
+
+
+def test_calculate_sleep_stops():
+    cumulative_distance = np.array([0.0, 1.0, 1.0, 2.0, 3.0])
+    assert grt.calculate_sleep_stops(cumulative_distance, 1.5, 2) == [
+        {"night": 1, "index": 1, "target_distance": 1.5},
+        {"night": 2, "index": 4, "target_distance": 3.0},
+    ]
+
+
+def assert_same_points(a, b):
+    np.testing.assert_array_equal(a.lats, b.lats)
+    np.testing.assert_array_equal(a.lons, b.lons)
+    assert a.eles == b.eles
+    assert a.times == b.times
+
+
+def test_parse_gpx(route_gpx):
+    gpx_type, all_points, name = grt.parse_gpx(io.BytesIO(route_gpx))
+    assert gpx_type == "track"
+    assert name == "Coast & Ridge"
+    assert len(all_points) == 6
+    assert all_points.coords(0) == (56.43, 12.8)
+    assert all_points.eles == ["12.5", "20.0", "31.0", "", None, "8.0"]
+    assert all_points.times[1] == "2025-06-01T09:00:00Z"
+    assert all_points.times[2] is None
+
+
+@pytest.mark.parametrize(
+    "namespace",
+    [' xmlns="http://www.topografix.com/GPX/1/0"', ""],
+    ids=["gpx-1.0", "no-namespace"],
+)
+def test_parse_gpx_maps_older_tags(route_gpx, namespace):
+    other = route_gpx.replace(b' xmlns="http://www.topografix.com/GPX/1/1"', b"")
+    other = other.replace(b"<gpx ", f"<gpx{namespace} ".encode())
+    expected = grt.parse_gpx(io.BytesIO(route_gpx))
+    gpx_type, all_points, name = grt.parse_gpx(io.BytesIO(other))
+    assert gpx_type == expected[0]
+    assert name == expected[2]
+    assert_same_points(all_points, expected[1])
+
+
+def test_cache_hit_matches_cache_miss(route_gpx, cache_dir):
+    miss = grt.parse_gpx_cached(route_gpx)
+    assert len(os.listdir(cache_dir)) == 1
+    hit = grt.parse_gpx_cached(route_gpx)
+    assert hit[0] == miss[0]
+    assert hit[2] == miss[2]
+    assert_same_points(hit[1], miss[1])
+
+
+def test_cache_key_includes_version_and_content(route_gpx, cache_dir, monkeypatch):
+    grt.parse_gpx_cached(route_gpx)
+    grt.parse_gpx_cached(route_gpx.replace(b"56.5300", b"56.5400"))
+    monkeypatch.setattr(grt, "__version__", "0.0.0-test")
+    grt.parse_gpx_cached(route_gpx)
+    assert len(os.listdir(cache_dir)) == 3
+
+
+def test_corrupt_cache_file_is_reparsed(route_gpx, cache_dir):
+    expected = grt.parse_gpx_cached(route_gpx)
+    (cache_file,) = cache_dir.iterdir()
+    with open(cache_file, "r+b") as f:
+        f.truncate(200)
+
+    gpx_type, all_points, name = grt.parse_gpx_cached(route_gpx)
+    assert (gpx_type, name) == (expected[0], expected[2])
+    assert_same_points(all_points, expected[1])
+
+    # The damaged entry was replaced by a complete one
+    assert os.listdir(cache_dir) == [cache_file.name]
+    assert_same_points(grt.parse_gpx_cached(route_gpx)[1], expected[1])
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2025-06-01T09:30", datetime(2025, 6, 1, 9, 30)),
+        (" 2025-06-01 09:30 ", datetime(2025, 6, 1, 9, 30)),
+        ("2025/06/01 09:30", datetime(2025, 6, 1, 9, 30)),
+        ("2025-06-01T09:30+02:00", datetime(2025, 6, 1, 7, 30)),
+    ],
+)
+def test_parse_user_time(text, expected):
+    assert grt.parse_user_time(text) == expected
+
+
+def test_parse_user_time_rejects_invalid_input():
+    with pytest.raises(SystemExit):
+        grt.parse_user_time("tomorrow morning")
+
+
+def plan_route(route_gpx):
+    """Parse the test route and place one sleep stop halfway"""
+    _, all_points, name = grt.parse_gpx(io.BytesIO(route_gpx))
+    all_points.cumulative_distance = grt.calculate_distances_vectorized(
+        all_points.lats, all_points.lons
+    )
+    total_distance = all_points.cumulative_distance[-1]
+    sleep_stops = grt.calculate_sleep_stops(
+        all_points.cumulative_distance, total_distance / 2, 1
+    )
+    return all_points, sleep_stops, name
+
+
+def read_text(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def test_gpx_output_matches_golden_file(route_gpx, tmp_path):
+    all_points, sleep_stops, name = plan_route(route_gpx)
+    filename = tmp_path / "route.gpx"
+    grt.write_gpx_file(
+        filename,
+        grt.create_komoot_compatible_gpx(
+            all_points, sleep_stops, START_TIME, END_TIME, 4.0, name
+        ),
+    )
+
+    # The metadata time is the moment the file was created
+    content = re.sub(
+        r"(?<=\t\t<time>)[^<]*(?=</time>\n\t</metadata>)",
+        GOLDEN_CREATED,
+        read_text(filename),
+    )
+    assert content == read_text(os.path.join(DATA_DIR, "route_expected.gpx"))
+
+
+def test_kml_output_matches_golden_file(route_gpx, tmp_path):
+    all_points, sleep_stops, name = plan_route(route_gpx)
+    filename = tmp_path / "route.kml"
+    grt.save_kml_file(filename, all_points, sleep_stops, name, START_TIME, END_TIME)
+    assert read_text(filename) == read_text(
+        os.path.join(DATA_DIR, "route_expected.kml")
+    )
+
+
+def test_no_png_leaves_image_out_of_markdown(tmp_path, monkeypatch, cache_dir):
+    route_file = os.path.join(DATA_DIR, "route.gpx")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("sys.argv", ["gpx-route-timer", route_file, "--no-png"])
+    # Accept the default answer to every prompt
+    monkeypatch.setattr("builtins.input", lambda prompt="": "")
+    grt.main()
+
+    (md_file,) = tmp_path.glob("*.md")
+    assert "![Route map]" not in read_text(md_file)
+    assert not list(tmp_path.glob("*.png"))